@@ -0,0 +1,73 @@
+# lib/benchmarks/catalog.py
+
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+GENRES = ["rock", "metal", "jazz", "pop", "folk", "punk", "blues", "techno", "hip hop", "country"]
+
+class Catalog:
+    # What was generated, so benchmarks can pick lookup keys that exist.
+    def __init__(self, bands, tours, locations, venues, first_day, days_per_venue):
+        self.bands = bands
+        self.tours = tours
+        self.locations = locations
+        self.venues = venues
+        self.first_day = first_day
+        self.days_per_venue = days_per_venue
+
+    def venue(self, index):
+        return f"venue {index % self.venues}"
+
+    def location(self, index):
+        return f"city {index % self.locations}"
+
+    def free_day(self, offset):
+        # Days past the generated range are free at every venue.
+        return self.first_day + timedelta(days=self.days_per_venue + 1 + offset)
+
+def generate_catalog(path, tours, bands=None, locations=None, venues=None, seed=0, batch_size=50000):
+    # Writes straight to SQLite rather than through the models: the point is
+    # a realistic table to measure against, and validating a million
+    # synthetic rows would dominate setup time. Every (venue, day) pair is
+    # unique, matching the schema's double-booking constraint.
+    rng = random.Random(seed)
+    bands = bands or max(10, tours // 20)
+    locations = locations or max(5, tours // 500)
+    venues = venues or max(10, tours // 50)
+    first_day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=30)
+    days_per_venue = tours // venues + 1
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")
+
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO bands (id, name, genre) VALUES (?, ?, ?)",
+        ((band_id, f"band {band_id}", rng.choice(GENRES)) for band_id in range(1, bands + 1)),
+    )
+    conn.execute("COMMIT")
+
+    def rows(start, stop):
+        for index in range(start, stop):
+            day = first_day + timedelta(days=index // venues)
+            yield (
+                rng.randint(1, bands),
+                f"city {rng.randrange(locations)}",
+                f"venue {index % venues}",
+                day.toordinal(),
+            )
+
+    for start in range(0, tours, batch_size):
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO tour_dates (band_id, location, venue, day) VALUES (?, ?, ?, ?)",
+            rows(start, min(start + batch_size, tours)),
+        )
+        conn.execute("COMMIT")
+
+    conn.execute("ANALYZE")
+    conn.close()
+
+    return Catalog(bands, tours, locations, venues, first_day, days_per_venue)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# lib/benchmarks/load.py
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+LIB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, LIB_DIR)
+
+from benchmarks.catalog import generate_catalog
+from benchmarks.model_ops import percentile
+from models.connection import close_connection, configure, get_connection
+
+DEFAULT_CLIENTS = [1, 2, 4, 8, 16, 32]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def request_paths(catalog, rng, hot_share):
+    # A mix of listings and point lookups. hot_share of requests go to a
+    # handful of popular pages, which is where request coalescing pays off.
+    while True:
+        if rng.random() < hot_share:
+            yield rng.choice(["/tours?limit=20", "/bands/1", f"/tours?venue={catalog.venue(0)}&limit=20"])
+            continue
+        choice = rng.random()
+        if choice < 0.4:
+            yield f"/tours/{rng.randint(1, catalog.tours)}"
+        elif choice < 0.7:
+            yield f"/bands/{rng.randint(1, catalog.bands)}/tours"
+        else:
+            yield f"/tours?venue={catalog.venue(rng.randrange(catalog.venues))}&limit=20"
+
+async def client(port, paths, deadline, latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < deadline:
+            path = next(paths).replace(" ", "%20")
+            started = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            await writer.drain()
+
+            length = 0
+            await reader.readline()
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+async def run_clients(port, catalog, clients, seconds, hot_share, seed):
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client(port, request_paths(catalog, random.Random(rng.random()), hot_share), deadline, latencies)
+        for _ in range(clients)
+    ))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "requests_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+    }
+
+async def fetch_json(port, path):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.1\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b"\r\n\r\n", 1)[1])
+
+def start_server(path, port, workers):
+    # The server runs in its own process so the load generator does not
+    # compete with it for the GIL.
+    env = dict(os.environ, TOUR_SCHEDULE_DB=path)
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(LIB_DIR, "server.py"), "--port", str(port), "--workers", str(workers)],
+        env=env, stdout=subprocess.PIPE, text=True,
+    )
+    process.stdout.readline()
+    return process
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput of server.py as concurrent clients increase.")
+    parser.add_argument("--tours", type=int, default=100000, help="tour dates in the synthetic catalogue")
+    parser.add_argument("--clients", type=int, nargs="+", default=DEFAULT_CLIENTS)
+    parser.add_argument("--workers", type=int, nargs="+", default=[4], help="database worker threads to compare")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each run")
+    parser.add_argument("--hot-share", type=float, default=0.3, help="share of requests for a few popular pages")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {"tours": args.tours, "seconds": args.seconds, "hot_share": args.hot_share, "results": {}}
+
+    with tempfile.TemporaryDirectory(prefix="tour_load_") as directory:
+        path = os.path.join(directory, "catalog.db")
+        configure(path)
+        get_connection()
+        catalog = generate_catalog(path, args.tours)
+        close_connection()
+
+        for workers in args.workers:
+            port = free_port()
+            server = start_server(path, port, workers)
+            try:
+                results = report["results"][str(workers)] = {}
+                for clients in args.clients:
+                    results[str(clients)] = asyncio.run(
+                        run_clients(port, catalog, clients, args.seconds, args.hot_share, seed=clients)
+                    )
+                    print(f"  workers {workers:>2} clients {clients:>3} "
+                          f"{results[str(clients)]['requests_per_sec']:>10} req/s", file=sys.stderr)
+                results["server"] = asyncio.run(fetch_json(port, "/stats"))["data"]
+            finally:
+                server.terminate()
+                server.wait()
+
+    document = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            out.write(document + "\n")
+    else:
+        print(document)
+
+if __name__ == "__main__":
+    main()
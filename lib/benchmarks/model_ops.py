@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# lib/benchmarks/model_ops.py
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+LIB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, LIB_DIR)
+
+from benchmarks.catalog import generate_catalog
+from models.band import Band
+from models.connection import close_connection, configure, get_connection
+from models.query_cache import QUERY_CACHE
+from models.tour_date import TourDate
+
+DEFAULT_SIZES = [1000, 100000]
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def measure(operation, iterations, warm=False):
+    # Identity maps and the query cache are cleared before every call so
+    # lookups measure the database path, except for the operations that are
+    # there to measure a warm cache.
+    latencies = []
+    for index in range(iterations):
+        if not warm:
+            Band.identity_map.clear()
+            TourDate.identity_map.clear()
+            QUERY_CACHE.clear()
+        started = time.perf_counter()
+        operation(index)
+        latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "iterations": iterations,
+        "ops_per_sec": round(iterations / total, 1) if total else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 4),
+    }
+
+def operations(catalog, size):
+    full_scans = max(1, min(20, 200000 // max(size, 1)))
+
+    def band_create(index):
+        Band.create(f"bench band {index}", "rock")
+
+    def tour_create(index):
+        TourDate.create(1 + index % catalog.bands, f"bench city {index}", catalog.free_day(index), f"bench venue {index}")
+
+    def find_by_id(index):
+        TourDate.find_by_id(1 + (index * 7919) % catalog.tours)
+
+    def find_by_band(index):
+        TourDate.find_by_band(1 + (index * 31) % catalog.bands)
+
+    def find_by_location(index):
+        TourDate.find_by_location(catalog.location(index * 13))
+
+    def find_by_venue(index):
+        TourDate.find_by_venue(catalog.venue(index * 17))
+
+    def find_by_venue_and_date(index):
+        TourDate.find_by_venue_and_date(catalog.venue(index), catalog.first_day)
+
+    def all_chronological(index):
+        TourDate.all_chronological()
+
+    def update(index):
+        tour_id = 1 + (index * 104729) % catalog.tours
+        TourDate.update(tour_id, new_date=catalog.free_day(1000000 + index))
+
+    def delete(index):
+        TourDate.delete(catalog.tours - index)
+
+    def availability_free_windows(index):
+        TourDate.availability.free_windows("venue", catalog.venue(index), catalog.first_day, catalog.free_day(0))
+
+    def availability_conflicts(index):
+        # A ten-stop itinerary, as a routing planner would probe it.
+        stops = [(catalog.venue(index * 10 + stop), catalog.first_day + timedelta(days=stop)) for stop in range(10)]
+        TourDate.availability.conflicts(stops, band_id=1 + index % catalog.bands)
+
+    def menu_page(index):
+        TourDate.page()
+
+    def menu_bands(index):
+        Band.find_by_name(f"band {1 + index % 10}")
+
+    return [
+        ("Band.create", band_create, 200),
+        ("TourDate.create", tour_create, 200),
+        ("TourDate.find_by_id", find_by_id, 1000),
+        ("TourDate.find_by_band", find_by_band, 200),
+        ("TourDate.find_by_location", find_by_location, 200),
+        ("TourDate.find_by_venue", find_by_venue, 200),
+        ("TourDate.find_by_venue_and_date", find_by_venue_and_date, 1000),
+        ("TourDate.all_chronological", all_chronological, full_scans),
+        ("TourDate.update", update, 200),
+        ("TourDate.delete", delete, 200),
+        ("Availability.free_windows", availability_free_windows, 1000),
+        ("Availability.conflicts (10 stops)", availability_conflicts, 1000),
+        ("TourDate.page (warm cache)", menu_page, 1000, True),
+        ("Band.find_by_name (warm cache)", menu_bands, 1000, True),
+    ]
+
+def run_size(size, directory):
+    path = os.path.join(directory, f"catalog_{size}.db")
+    configure(path)
+    get_connection()
+
+    started = time.perf_counter()
+    catalog = generate_catalog(path, size)
+    results = {"generate_seconds": round(time.perf_counter() - started, 2), "operations": {}}
+
+    started = time.perf_counter()
+    TourDate.availability.refresh()
+    results["availability_load_seconds"] = round(time.perf_counter() - started, 2)
+
+    for name, operation, iterations, *warm in operations(catalog, size):
+        results["operations"][name] = measure(operation, iterations, *warm)
+        print(f"  {size:>9} {name:<34} {results['operations'][name]['ops_per_sec']:>12} ops/s", file=sys.stderr)
+
+    results["query_cache"] = QUERY_CACHE.stats()
+    close_connection()
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=LIB_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the Band/TourDate model operations against synthetic catalogues.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="tour dates per catalogue, e.g. 1000 100000 1000000")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="tour_bench_") as directory:
+        for size in args.sizes:
+            report["results"][str(size)] = run_size(size, directory)
+
+    document = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            out.write(document + "\n")
+    else:
+        print(document)
+
+if __name__ == "__main__":
+    main()
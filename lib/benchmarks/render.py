@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# lib/benchmarks/render.py
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from colorama import Fore
+from models.band import Band
+from models.tour_date import TourDate
+from rendering import Renderer, render_tour_dates
+
+GENRES = ["rock", "metal", "jazz", "pop", "folk", "punk", "blues", "techno"]
+CITIES = ["london", "paris", "berlin", "new york", "tokyo", "madrid", "chicago", "lisbon", "oslo", "austin"]
+
+class LegacyColorManager:
+    # The list-scanning, random-choice palette that cli.py used before
+    # rendering.py, kept here as the baseline.
+    COLORS = [Fore.RED, Fore.GREEN, Fore.BLUE, Fore.MAGENTA, Fore.CYAN, Fore.YELLOW, Fore.WHITE]
+
+    location_colors = {}
+    used_location_colors = set()
+
+    @classmethod
+    def get_location_color(cls, location):
+        normalized_location = location.strip().lower()
+
+        if normalized_location not in cls.location_colors:
+            available_colors = [color for color in cls.COLORS if color not in cls.used_location_colors]
+
+            if not available_colors:
+                cls.used_location_colors.clear()
+                available_colors = cls.COLORS.copy()
+
+            selected_color = random.choice(available_colors)
+            cls.location_colors[normalized_location] = selected_color
+            cls.used_location_colors.add(selected_color)
+
+        return cls.location_colors[normalized_location]
+
+def synthetic_tours(count, bands=500):
+    # Rows are hydrated straight into the identity maps, so the benchmark
+    # measures rendering only and never touches the database.
+    Band.identity_map.maxsize = max(Band.identity_map.maxsize, bands)
+    for band_id in range(1, bands + 1):
+        Band.from_row((band_id, f"band {band_id}", GENRES[band_id % len(GENRES)]))
+
+    tours = []
+    for tour_id in range(1, count + 1):
+        band_id = tour_id % bands + 1
+        day = date(2030 + tour_id % 10, tour_id % 12 + 1, tour_id % 28 + 1)
+        row = (tour_id, band_id, CITIES[tour_id % len(CITIES)], f"venue {tour_id % 2000}", day,
+               f"band {band_id}", GENRES[band_id % len(GENRES)])
+        tours.append(TourDate.from_joined_row(row))
+    return tours
+
+def legacy_render(tours, out):
+    for tour in tours:
+        location_color = LegacyColorManager.get_location_color(tour.location)
+        print(location_color + f"ID: {tour.id}, Band: {tour.band.name} (Band ID: {tour.band_id}), Location: {tour.location}, Date: {tour.day}, Venue: {tour.venue}", file=out)
+
+def chunked_render(tours, out, color):
+    render_tour_dates(tours, Renderer(out, color=color))
+
+def timed(render, tours, out):
+    started = time.perf_counter()
+    render(tours, out)
+    out.flush()
+    return time.perf_counter() - started
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rows per second for a large tour listing, before and after chunked rendering.")
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    tours = synthetic_tours(args.rows)
+    results = {"rows": args.rows}
+
+    # buffering=1 behaves like a terminal (a write per line); the default
+    # block buffering behaves like a pipe.
+    for sink, buffering in (("line_buffered", 1), ("block_buffered", -1)):
+        with open(os.devnull, "w", buffering=buffering) as out:
+            before = timed(legacy_render, tours, out)
+            after_color = timed(lambda rows, o: chunked_render(rows, o, True), tours, out)
+            after_plain = timed(lambda rows, o: chunked_render(rows, o, False), tours, out)
+
+        results[sink] = {
+            "before_rows_per_sec": round(args.rows / before),
+            "after_color_rows_per_sec": round(args.rows / after_color),
+            "after_plain_rows_per_sec": round(args.rows / after_plain),
+        }
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
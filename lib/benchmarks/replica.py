@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# lib/benchmarks/replica.py
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+LIB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, LIB_DIR)
+
+from benchmarks.catalog import generate_catalog
+from benchmarks.model_ops import measure
+from models.connection import close_connection, configure, get_connection
+from models.replica import save_image, serve_read_only
+from models.tour_date import TourDate
+
+DEFAULT_SIZES = [100000, 1000000]
+
+def lookups(catalog):
+    def find_by_id(index):
+        TourDate.find_by_id(1 + (index * 7919) % catalog.tours)
+
+    def find_by_band(index):
+        TourDate.find_by_band(1 + (index * 31) % catalog.bands)
+
+    def find_by_location(index):
+        TourDate.find_by_location(catalog.location(index * 13))
+
+    def find_by_venue_and_date(index):
+        TourDate.find_by_venue_and_date(catalog.venue(index), catalog.first_day)
+
+    return {
+        "find_by_id": find_by_id,
+        "find_by_band": find_by_band,
+        "find_by_location": find_by_location,
+        "find_by_venue_and_date": find_by_venue_and_date,
+    }
+
+def run_size(directory, size, iterations):
+    path = os.path.join(directory, f"catalog_{size}.db")
+    configure(path)
+    get_connection()
+    catalog = generate_catalog(path, size)
+    operations = lookups(catalog)
+
+    results = {"disk": {name: measure(operation, iterations) for name, operation in operations.items()}}
+
+    started = time.perf_counter()
+    replica = serve_read_only(path)
+    results["cold_load_s"] = round(time.perf_counter() - started, 3)
+    results["memory"] = {name: measure(operation, iterations) for name, operation in operations.items()}
+    replica.close()
+
+    image = os.path.join(directory, f"image_{size}.db")
+    started = time.perf_counter()
+    save_image(image, path)
+    results["save_image_s"] = round(time.perf_counter() - started, 3)
+    started = time.perf_counter()
+    serve_read_only(path, image).close()
+    results["warm_start_s"] = round(time.perf_counter() - started, 3)
+
+    close_connection()
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lookup latency from the database file versus the in-memory replica.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {"iterations": args.iterations, "results": {}}
+    with tempfile.TemporaryDirectory(prefix="tour_replica_") as directory:
+        for size in args.sizes:
+            report["results"][str(size)] = results = run_size(directory, size, args.iterations)
+            print(f"  {size:>9} tours: cold load {results['cold_load_s']}s, warm start {results['warm_start_s']}s", file=sys.stderr)
+
+    document = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            out.write(document + "\n")
+    else:
+        print(document)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# lib/benchmarks/startup.py
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+LIB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BUDGET_MS = 250
+
+# Imports the CLI the way `python cli.py` would and reports how long that
+# took, plus whether any GUI module was pulled in as a side effect.
+PROBE = """
+import sys, time
+started = time.perf_counter()
+import cli
+elapsed = time.perf_counter() - started
+gui = sorted(name for name in ("tkinter", "tkcalendar") if name in sys.modules)
+print(elapsed * 1000, ",".join(gui))
+"""
+
+def measure(runs):
+    timings = []
+    gui_modules = set()
+
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=LIB_DIR, capture_output=True, text=True, check=True,
+        )
+        elapsed, _, loaded = result.stdout.strip().partition(" ")
+        timings.append(float(elapsed))
+        gui_modules.update(filter(None, loaded.split(",")))
+
+    return timings, gui_modules
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the CLI cold-start import time against a budget.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("CLI_STARTUP_BUDGET_MS", DEFAULT_BUDGET_MS)))
+    args = parser.parse_args(argv)
+
+    timings, gui_modules = measure(args.runs)
+    median = statistics.median(timings)
+    print(f"cli import: median {median:.1f} ms, max {max(timings):.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if gui_modules:
+        print(f"FAIL: GUI modules imported at startup: {', '.join(sorted(gui_modules))}")
+        failed = True
+    if median > args.budget_ms:
+        print("FAIL: cold start is over budget")
+        failed = True
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
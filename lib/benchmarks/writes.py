@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# lib/benchmarks/writes.py
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+LIB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, LIB_DIR)
+
+from benchmarks.catalog import generate_catalog
+from models.connection import close_connection, configure, get_connection
+from models.tour_date import TourDate
+from models.writer import WriteQueue
+
+DEFAULT_CLIENTS = [1, 4, 8, 32]
+FAILURE_EVERY = 25
+
+def client_operations(catalog, run, client, count):
+    # (arguments, should_fail) for one client. Every FAILURE_EVERY-th
+    # operation books a venue the same client already holds that day, so
+    # the expected failures are known up front and can be checked against
+    # what each caller was told.
+    first_day = catalog.free_day(0)
+    for index in range(count):
+        venue = f"{run} client {client} venue {index}"
+        should_fail = index and index % FAILURE_EVERY == 0
+        if should_fail:
+            venue = f"{run} client {client} venue {index - 1}"
+        yield (1 + index % catalog.bands, "bench city", first_day + timedelta(days=client), venue), should_fail
+
+def run_clients(catalog, run, clients, count, submit):
+    outcomes = []
+    lock = threading.Lock()
+
+    def client(number):
+        local = []
+        for arguments, should_fail in client_operations(catalog, run, number, count):
+            try:
+                submit(*arguments)
+                local.append((should_fail, None))
+            except ValueError as e:
+                local.append((should_fail, str(e)))
+            except Exception as e:
+                local.append((should_fail, f"{type(e).__name__}: {e}"))
+        close_connection()
+        with lock:
+            outcomes.extend(local)
+
+    threads = [threading.Thread(target=client, args=(number,)) for number in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    expected = sum(1 for should_fail, _ in outcomes if should_fail)
+    attributed = sum(1 for should_fail, error in outcomes if should_fail and error and "already booked" in error)
+    unexpected = sorted({error for should_fail, error in outcomes if error and not should_fail})
+    return {
+        "operations": len(outcomes),
+        "ops_per_sec": round(len(outcomes) / elapsed, 1),
+        "expected_failures": expected,
+        "attributed_failures": attributed,
+        "unexpected_errors": unexpected[:5],
+    }
+
+def direct(catalog, run, clients, count):
+    # Every client thread writes through its own connection.
+    return run_clients(catalog, run, clients, count, TourDate.create)
+
+def queued(catalog, run, clients, count, writer):
+    return run_clients(catalog, run, clients, count, lambda *arguments: writer.call(TourDate.create, *arguments))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write throughput of concurrent clients, direct versus the group-commit queue.")
+    parser.add_argument("--clients", type=int, nargs="+", default=DEFAULT_CLIENTS)
+    parser.add_argument("--operations", type=int, default=500, help="writes per client")
+    parser.add_argument("--tours", type=int, default=10000, help="tour dates in the synthetic catalogue")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {"operations_per_client": args.operations, "results": {}}
+
+    with tempfile.TemporaryDirectory(prefix="tour_writes_") as directory:
+        path = os.path.join(directory, "catalog.db")
+        configure(path)
+        get_connection()
+        catalog = generate_catalog(path, args.tours)
+
+        with WriteQueue() as writer:
+            for clients in args.clients:
+                results = report["results"][str(clients)] = {
+                    "direct": direct(catalog, f"direct {clients}", clients, args.operations),
+                    "queued": queued(catalog, f"queued {clients}", clients, args.operations, writer),
+                }
+                print(f"  clients {clients:>3} direct {results['direct']['ops_per_sec']:>10} ops/s "
+                      f"queued {results['queued']['ops_per_sec']:>10} ops/s", file=sys.stderr)
+            report["writer"] = writer.stats()
+        close_connection()
+
+    document = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            out.write(document + "\n")
+    else:
+        print(document)
+
+if __name__ == "__main__":
+    main()
@@ -1,79 +1,19 @@
 #!/usr/bin/env python3
 
 from colorama import Fore, init
-from tkcalendar import Calendar
-import tkinter as tk
 from models.band import Band
-from models.tour_date import TourDate
+from models.tour_date import TourDate, PAGE_SIZE
 from helpers import exit_program
+from date_picker import select_date
+from models.instrumentation import summary as query_summary
+from models.query_cache import QUERY_CACHE
+from models.replica import start_from_env
+from models.search import exists as term_exists, search
+from models import stats
+from rendering import Renderer, render_bands, render_summaries, render_tour_dates
 from datetime import datetime
-import random
-
-# Initialize colorama for CLI coloring
-init(autoreset=True)
-
-class ColorManager:
-    COLORS = [Fore.RED, Fore.GREEN, Fore.BLUE, Fore.MAGENTA, Fore.CYAN, Fore.YELLOW, Fore.WHITE]
-
-    genre_colors = {}
-    location_colors = {}
-    
-    used_genre_colors = set()
-    used_location_colors = set()
-
-    @classmethod
-    def get_genre_color(cls, genre):
-        if genre not in cls.genre_colors:
-            available_colors = [color for color in cls.COLORS if color not in cls.used_genre_colors]
-            
-            if not available_colors:
-                cls.used_genre_colors.clear()
-                available_colors = cls.COLORS.copy()
-
-            selected_color = random.choice(available_colors)
-            cls.genre_colors[genre] = selected_color
-            cls.used_genre_colors.add(selected_color)
-
-        return cls.genre_colors[genre]
-
-    @classmethod
-    def get_location_color(cls, location):
-        normalized_location = location.strip().lower()
-
-        if normalized_location not in cls.location_colors:
-            available_colors = [color for color in cls.COLORS if color not in cls.used_location_colors]
-            
-            if not available_colors:
-                cls.used_location_colors.clear()
-                available_colors = cls.COLORS.copy()
-
-            selected_color = random.choice(available_colors)
-            cls.location_colors[normalized_location] = selected_color
-            cls.used_location_colors.add(selected_color)
-
-        return cls.location_colors[normalized_location]
-
-def select_date_gui():
-    selected_date = None
-    
-    root = tk.Tk()
-    root.title("Select a Date")
-
-    cal = Calendar(root, selectmode='day', year=2024, month=10, day=1)
-    cal.pack(pady=20)
-
-    def grab_date():
-        nonlocal selected_date
-        selected_date = cal.get_date()
-        root.quit()
-
-    select_btn = tk.Button(root, text="Select", command=grab_date)
-    select_btn.pack(pady=20)
-
-    root.mainloop()
-    root.destroy()
-    
-    return selected_date
+from functools import partial
+import sys
 
 def format_date(date_str):
     try:
@@ -91,12 +31,50 @@ def format_date(date_str):
             print(f"Exception: {e}")
             raise e
 
+def find_band(band_name_or_id):
+    if band_name_or_id.isdigit():
+        return Band.find_by_id(band_name_or_id)
+
+    band = Band.find_by_name(band_name_or_id)
+    if band is None:
+        match = suggest("band", band_name_or_id)
+        if match:
+            band = Band.find_by_id(match.ref)
+    return band
+
+def resolve_place(kind, value):
+    # Locations and venues that match nothing exactly get the same
+    # "did you mean" prompt as band names; otherwise the value is kept.
+    if not value or term_exists(kind, value):
+        return value
+    match = suggest(kind, value)
+    return match.term if match else value
+
+def suggest(kind, text, limit=5):
+    matches = search(text, kinds=[kind], limit=limit)
+    if not matches:
+        return None
+
+    print(Fore.YELLOW + f"No {kind} named '{text}'. Did you mean:")
+    for number, match in enumerate(matches, start=1):
+        print(Fore.CYAN + f"{number}. {match.term}")
+    choice = input(Fore.YELLOW + "Pick a number (leave blank for none): ").strip()
+
+    if choice.isdigit() and 1 <= int(choice) <= len(matches):
+        return matches[int(choice) - 1]
+    return None
+
 def main():
+    # Initialize colorama for CLI coloring. Only the interactive menus need it;
+    # command mode output must stay free of escape codes.
+    init(autoreset=True)
+
     while True:
         print(Fore.BLUE + "Main Menu:")
         print(Fore.CYAN + "0. Exit Program")
         print(Fore.CYAN + "1. Bands Menu")
         print(Fore.CYAN + "2. Tour Dates Menu")
+        print(Fore.CYAN + "3. Statistics Menu")
         choice = input(Fore.YELLOW + "> ")
 
         if choice == "0":
@@ -105,6 +83,12 @@ def main():
             bands_menu()
         elif choice == "2":
             tour_dates_menu()
+        elif choice == "3":
+            stats_menu()
+        elif choice == "99":
+            # Hidden entry: per-statement timings and cache counters for this session.
+            print(query_summary())
+            print(QUERY_CACHE.summary())
         else:
             print(Fore.RED + "Invalid choice")
 
@@ -160,91 +144,107 @@ def tour_dates_menu():
         else:
             print(Fore.RED + "Invalid choice")
 
+def stats_menu():
+    while True:
+        print(Fore.BLUE + "Statistics Menu:")
+        print(Fore.CYAN + "0. Return to Main Menu")
+        print(Fore.CYAN + "1. Bands with the most dates")
+        print(Fore.CYAN + "2. Busiest venues")
+        print(Fore.CYAN + "3. Next show per city")
+        print(Fore.CYAN + "4. Rebuild statistics")
+        choice = input(Fore.YELLOW + "> ")
+
+        if choice == "0":
+            break
+        elif choice == "1":
+            view_summaries("band", "tours", "No bands have tour dates.")
+        elif choice == "2":
+            view_summaries("venue", "tours", "No venues have tour dates.")
+        elif choice == "3":
+            view_summaries("location", "next", "No cities have tour dates.")
+        elif choice == "4":
+            counts = stats.rebuild()
+            print(Fore.GREEN + f"Statistics rebuilt for {counts['band']} bands, {counts['venue']} venues "
+                  f"and {counts['location']} cities.")
+        else:
+            print(Fore.RED + "Invalid choice")
+
+def view_summaries(kind, order, not_found_message):
+    if not render_summaries(stats.summaries(kind, order, limit=PAGE_SIZE)):
+        print(Fore.RED + not_found_message)
+
 def view_bands():
     band_name_or_id = input(Fore.CYAN + "Enter the band name or ID to view (leave blank to view all): ")
 
     if band_name_or_id:
 
-        if band_name_or_id.isdigit():
-            band = Band.find_by_id(band_name_or_id)
-        else:
-            band = Band.find_by_name(band_name_or_id)
+        band = find_band(band_name_or_id)
 
         if not band:
             print(Fore.RED + "Band not found.")
         else:
 
-            genre_color = ColorManager.get_genre_color(band[2])  
-            print(genre_color + f"ID: {band[0]}, Name: {band[1]}, Genre: {band[2]}")
+            render_bands([band])
     else:
 
-        bands = Band.all()
-        for band in bands:
-
-            genre_color = ColorManager.get_genre_color(band[2])
-            print(genre_color + f"ID: {band[0]}, Name: {band[1]}, Genre: {band[2]}")
+        render_bands(Band.iter_all())
 
 def create_band():
 
     try:
         name = input(Fore.CYAN + "Enter band name: ")
         genre = input(Fore.CYAN + "Enter genre: ")
-        Band.create(name, genre)
+        band = Band.create(name, genre)
+        print(Fore.GREEN + f"Band '{band.name}' created successfully.")
     except ValueError as e:
         print(Fore.RED + f"Error: {e}")
 
 def update_band():
     band_name_or_id = input(Fore.CYAN + "Enter the band name or ID to update: ").strip().lower()
 
-    if band_name_or_id.isdigit():
-        band = Band.find_by_id(band_name_or_id)
-    else:
-        band = Band.find_by_name(band_name_or_id)
+    band = find_band(band_name_or_id)
 
     if not band:
         print(Fore.RED + "Error: Band not found.")
         return
     
-    new_name = input(Fore.CYAN + f"Enter new name for band '{band[1]}' (leave blank to keep current): ")
-    new_genre = input(Fore.CYAN + f"Enter new genre for band '{band[2]}' (leave blank to keep current): ")
+    new_name = input(Fore.CYAN + f"Enter new name for band '{band.name}' (leave blank to keep current): ")
+    new_genre = input(Fore.CYAN + f"Enter new genre for band '{band.genre}' (leave blank to keep current): ")
     
     try:
-        Band.update(band[0], new_name if new_name else None, new_genre if new_genre else None)
+        band = Band.update(band.id, new_name if new_name else None, new_genre if new_genre else None)
+        print(Fore.GREEN + f"Band '{band.name}' with genre '{band.genre}' updated successfully.")
     except ValueError as e:
         print(Fore.RED + f"Error: {e}")
 
 def delete_band():
     band_name_or_id = input(Fore.CYAN + "Enter the band name or ID to delete: ")
 
-    if band_name_or_id.isdigit():
-        band = Band.find_by_id(band_name_or_id)
-    else:
-        band = Band.find_by_name(band_name_or_id)
+    band = find_band(band_name_or_id)
 
     if not band:
         print(Fore.RED + "Error: Band not found.")
         return
 
-    Band.delete(band[0])
+    Band.delete(band.id)
+    print(Fore.GREEN + f"Band '{band.name}' with genre '{band.genre}' has been successfully deleted.")
 
 def view_band_related_tours():
     band_name_or_id = input(Fore.CYAN + "Enter the band name or ID: ")
 
-    if band_name_or_id.isdigit():
-        band = Band.find_by_id(band_name_or_id)
-    else:
-        band = Band.find_by_name(band_name_or_id)
+    band = find_band(band_name_or_id)
 
     if not band:
         print(Fore.RED + "Error: Band not found.")
         return
 
-    tour_dates = TourDate.find_by_band(band[0])
-    if not tour_dates:
+    found = False
+    with Renderer() as out:
+        for tour in TourDate.iter_by_band(band.id):
+            found = True
+            out.line(f"ID: {tour.id}, Location: {tour.location}, Date: {tour.day}, Venue: {tour.venue}", Fore.YELLOW)
+    if not found:
         print(Fore.RED + "No tours found for this band.")
-    else:
-        for tour in tour_dates:
-            print(Fore.YELLOW + f"ID: {tour[0]}, Location: {tour[3]}, Date: {tour[4]}, Venue: {tour[5]}")
 
 def view_tour_dates():
     print(Fore.BLUE + "How would you like to filter the tour dates?")
@@ -257,51 +257,77 @@ def view_tour_dates():
 
     if choice == "1":
         band_name_or_id = input(Fore.CYAN + "Enter the band name or ID: ").strip().lower()
-        if band_name_or_id.isdigit():
-            band = Band.find_by_id(band_name_or_id)
-        else:
-            band = Band.find_by_name(band_name_or_id)
+        band = find_band(band_name_or_id)
 
         if not band:
             print(Fore.RED + "Band not found.")
             return
         
-        tour_dates = TourDate.find_by_band(band[0])
-        display_tour_dates(tour_dates, f"No tour dates found for band {band[1]}.")
+        display_tour_dates(partial(TourDate.page, "band", band.id), f"No tour dates found for band {band.name}.")
 
     elif choice == "2":
-        location = input(Fore.CYAN + "Enter the location: ").strip().lower()
-        tour_dates = TourDate.find_by_location(location)
-        display_tour_dates(tour_dates, f"No tour dates found at location '{location}'.")
+        location = resolve_place("location", input(Fore.CYAN + "Enter the location: ").strip().lower())
+        display_tour_dates(partial(TourDate.page, "location", location), f"No tour dates found at location '{location}'.")
 
     elif choice == "3":
-        venue = input(Fore.CYAN + "Enter the venue: ").strip().lower()
-        tour_dates = TourDate.find_by_venue(venue)
-        display_tour_dates(tour_dates, f"No tour dates found at venue '{venue}'.")
+        venue = resolve_place("venue", input(Fore.CYAN + "Enter the venue: ").strip().lower())
+        display_tour_dates(partial(TourDate.page, "venue", venue), f"No tour dates found at venue '{venue}'.")
 
     elif choice == "4":
-        tour_dates = TourDate.all_chronological()
-        display_tour_dates(tour_dates, "No tour dates found.")
+        display_tour_dates(TourDate.page, "No tour dates found.")
 
     else:
         print(Fore.RED + "Invalid choice. Please select a valid option.")
 
-def display_tour_dates(tour_dates, not_found_message):
-    
+def display_tour_dates(fetch_page, not_found_message):
+    # Pages are fetched with one extra row so we know whether another page
+    # exists in that direction without counting the whole result.
+    tour_dates = fetch_page(limit=PAGE_SIZE + 1)
+
     if not tour_dates:
         print(Fore.RED + not_found_message)
-    else:
-        for tour in tour_dates:
-            location_color = ColorManager.get_location_color(tour[3])
-            print(location_color + f"ID: {tour[0]}, Band: {tour[2]} (Band ID: {tour[1]}), Location: {tour[3]}, Date: {tour[4]}, Venue: {tour[5]}")
+        return
+
+    has_next = len(tour_dates) > PAGE_SIZE
+    has_previous = False
+    tour_dates = tour_dates[:PAGE_SIZE]
+
+    while True:
+        render_tour_dates(tour_dates)
+
+        if not (has_next or has_previous):
+            return
+
+        if has_next:
+            print(Fore.CYAN + "n. Next page")
+        if has_previous:
+            print(Fore.CYAN + "p. Previous page")
+        print(Fore.CYAN + "0. Done")
+        choice = input(Fore.YELLOW + "> ").strip().lower()
+
+        if choice == "n" and has_next:
+            page = fetch_page(after=TourDate.page_key(tour_dates[-1]), limit=PAGE_SIZE + 1)
+            if not page:
+                return
+            has_previous = True
+            has_next = len(page) > PAGE_SIZE
+            tour_dates = page[:PAGE_SIZE]
+        elif choice == "p" and has_previous:
+            page = fetch_page(before=TourDate.page_key(tour_dates[0]), limit=PAGE_SIZE + 1)
+            if not page:
+                return
+            has_next = True
+            has_previous = len(page) > PAGE_SIZE
+            tour_dates = page[-PAGE_SIZE:]
+        elif choice == "0":
+            return
+        else:
+            print(Fore.RED + "Invalid choice")
 
 def schedule_tour_date():
     band_name_or_id = input(Fore.CYAN + "Enter the band name or ID: ").strip().lower()
 
-    if band_name_or_id.isdigit():
-        band = Band.find_by_id(band_name_or_id)
-    else:
-        band = Band.find_by_name(band_name_or_id)
+    band = find_band(band_name_or_id)
 
     if not band:
         print(Fore.RED + "Error: Band not found.")
@@ -309,13 +335,16 @@ def schedule_tour_date():
 
     location = input(Fore.CYAN + "Enter location: ").strip().lower()  
 
-    date = select_date_gui()
+    date = select_date()
+    if not date:
+        print(Fore.RED + "Error: No date selected.")
+        return
     formatted_date = format_date(date)
 
     venue = input(Fore.CYAN + "Enter venue: ").strip().lower()
 
     try:
-        TourDate.create(band[0], location, formatted_date, venue)
+        TourDate.create(band.id, location, formatted_date, venue)
         print(Fore.GREEN + "Tour date created.")
     except ValueError as e:
         print(Fore.RED + f"Error: {e}")
@@ -330,38 +359,41 @@ def update_tour_date():
             print(Fore.RED + "Tour not found.")
             return
     else:
-        venue = input(Fore.CYAN + "Enter the venue: ").strip().lower()
+        venue = resolve_place("venue", input(Fore.CYAN + "Enter the venue: ").strip().lower())
         print(Fore.CYAN + "Select the tour date:")
-        date = select_date_gui()
+        date = select_date()
+        if not date:
+            print(Fore.RED + "Tour not found.")
+            return
         formatted_date = format_date(date)
         tour = TourDate.find_by_venue_and_date(venue, formatted_date)
         if not tour:
             print(Fore.RED + "Tour not found.")
             return
 
-    band = Band.find_by_id(tour[1])
+    band = tour.band
     if band:
-        print(Fore.GREEN + f"Tour at '{tour[4]}' on {tour[3]} for Band '{band[1]}' has been found.")
+        print(Fore.GREEN + f"Tour at '{tour.venue}' on {tour.day} for Band '{band.name}' has been found.")
     else:
-        print(Fore.GREEN + f"Tour at '{tour[4]}' on {tour[3]} for Band ID {tour[1]} has been found.")
+        print(Fore.GREEN + f"Tour at '{tour.venue}' on {tour.day} for Band ID {tour.band_id} has been found.")
 
-    new_location = input(Fore.CYAN + f"Enter new location for tour (current: {tour[2]}) (leave blank to keep current): ").strip().lower()
+    new_location = input(Fore.CYAN + f"Enter new location for tour (current: {tour.location}) (leave blank to keep current): ").strip().lower()
 
     print(Fore.CYAN + "Select the new tour date:")
-    new_date = select_date_gui()
-    formatted_new_date = format_date(new_date)
+    new_date = select_date()
+    formatted_new_date = format_date(new_date) if new_date else None
 
-    new_venue = input(Fore.CYAN + f"Enter new venue for tour (current: {tour[4]}) (leave blank to keep current): ").strip().lower()
+    new_venue = input(Fore.CYAN + f"Enter new venue for tour (current: {tour.venue}) (leave blank to keep current): ").strip().lower()
 
     try:
 
         TourDate.update(
-            tour[0], 
+            tour.id, 
             new_location if new_location else None, 
-            formatted_new_date if new_date else None, 
+            formatted_new_date, 
             new_venue if new_venue else None
         )
-        print(Fore.GREEN + f"Tour at '{new_location if new_location else tour[2]}' on {formatted_new_date} for Band '{band[1]}' has been updated.")
+        print(Fore.GREEN + f"Tour at '{new_location if new_location else tour.location}' on {formatted_new_date or tour.day} for Band '{band.name if band else tour.band_id}' has been updated.")
     except ValueError as e:
         print(Fore.RED + f"Error: {e}")
 
@@ -375,22 +407,27 @@ def delete_tour_date():
             print(Fore.RED + "Tour not found.")
             return
     else:
-        venue = input(Fore.CYAN + "Enter the venue: ").strip().lower()
+        venue = resolve_place("venue", input(Fore.CYAN + "Enter the venue: ").strip().lower())
         print(Fore.CYAN + "Select the tour date:")
-        date = select_date_gui()
+        date = select_date()
+        if not date:
+            print(Fore.RED + "Tour not found.")
+            return
         formatted_date = format_date(date)
         tour = TourDate.find_by_venue_and_date(venue, formatted_date)
         if not tour:
             print(Fore.RED + "Tour not found.")
             return
 
-    band = Band.find_by_id(tour[1])
+    if not TourDate.delete(tour.id):
+        print(Fore.RED + "Tour not found.")
+        return
+
+    band = tour.band
     if band:
-        print(Fore.GREEN + f"Tour at '{tour[4]}' on {tour[3]} for Band '{band[1]}' has been deleted.")
+        print(Fore.GREEN + f"Tour at '{tour.venue}' on {tour.day} for Band '{band.name}' has been deleted.")
     else:
-        print(Fore.GREEN + f"Tour at '{tour[4]}' on {tour[3]} for Band '{band[1]}' has been deleted.")
-
-    TourDate.delete(tour[0])
+        print(Fore.GREEN + f"Tour at '{tour.venue}' on {tour.day} for Band ID {tour.band_id} has been deleted.")
 
 def view_tour_related_band():
     tour_id = input(Fore.CYAN + "Enter the tour ID: ")
@@ -401,11 +438,15 @@ def view_tour_related_band():
         print(Fore.RED + "Error: Tour not found.")
         return
 
-    band = Band.find_by_id(tour[1])
+    band = tour.band
     if band:
-        print(Fore.YELLOW + f"Band Name: {band[1]}, Genre: {band[2]}")
+        print(Fore.YELLOW + f"Band Name: {band.name}, Genre: {band.genre}")
     else:
         print(Fore.RED + "Band not found for this tour.")
 
 if __name__ == "__main__":
+    start_from_env()
+    if len(sys.argv) > 1:
+        from commands import main as run_commands
+        sys.exit(run_commands(sys.argv[1:]))
     main()
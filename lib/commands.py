@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# lib/commands.py
+
+import argparse
+import io
+import json
+import shlex
+import sqlite3
+import sys
+from models.band import Band
+from models import change_log, replica, stats
+from models.search import KINDS as SEARCH_KINDS, search
+from models.tour_date import TourDate
+
+# Non-interactive counterpart of the menus in cli.py. Every command writes one
+# JSON document per line ({"ok": ..., "data"/"error": ...}) or TSV rows, so
+# schedulers can drive the schedule without colour codes or prompts.
+
+BAND_FIELDS = ("id", "name", "genre")
+TOUR_FIELDS = ("id", "band_id", "band", "location", "date", "venue")
+SUMMARY_FIELDS = ("key", "name", "tours", "upcoming", "first", "next", "last")
+CHANGE_FIELDS = change_log.Change._fields
+
+class CommandError(Exception):
+    pass
+
+# Reported as an error document for the one command; a batch carries on.
+# OverflowError comes from ids too large for SQLite's integers.
+COMMAND_ERRORS = (CommandError, ValueError, OverflowError, sqlite3.Error)
+
+def band_record(band):
+    return {"id": band.id, "name": band.name, "genre": band.genre}
+
+def tour_record(tour):
+    band = tour.band
+    return {
+        "id": tour.id,
+        "band_id": tour.band_id,
+        "band": band.name if band else None,
+        "location": tour.location,
+        "date": tour.day,
+        "venue": tour.venue,
+    }
+
+def summary_record(summary):
+    return {
+        "key": summary.key,
+        "name": summary.name,
+        "tours": summary.tours,
+        "upcoming": summary.upcoming,
+        "first": summary.first.isoformat(),
+        "next": summary.next.isoformat() if summary.next else None,
+        "last": summary.last.isoformat(),
+    }
+
+def find_band(name_or_id):
+    if name_or_id.isdigit():
+        band = Band.find_by_id(name_or_id)
+    else:
+        band = Band.find_by_name(name_or_id)
+
+    if not band:
+        raise CommandError(f"Band '{name_or_id}' not found.")
+    return band
+
+def find_tour(tour_id):
+    tour = TourDate.find_by_id(tour_id)
+    if not tour:
+        raise CommandError(f"Tour date '{tour_id}' not found.")
+    return tour
+
+def bands_list(args):
+    return BAND_FIELDS, map(band_record, Band.iter_all())
+
+def bands_show(args):
+    return BAND_FIELDS, [band_record(find_band(args.band))]
+
+def bands_create(args):
+    return BAND_FIELDS, [band_record(Band.create(args.name, args.genre))]
+
+def bands_update(args):
+    band = find_band(args.band)
+    return BAND_FIELDS, [band_record(Band.update(band.id, args.name, args.genre))]
+
+def bands_delete(args):
+    band = find_band(args.band)
+    return BAND_FIELDS, [band_record(Band.delete(band.id))]
+
+def bands_delete_many(args):
+    bands = [find_band(name_or_id) for name_or_id in args.bands]
+    Band.delete_many(band.id for band in bands)
+    return BAND_FIELDS, [band_record(band) for band in bands]
+
+def tours_list(args):
+    return TOUR_FIELDS, map(tour_record, TourDate.iter_chronological(args.history))
+
+def tours_by_band(args):
+    return TOUR_FIELDS, map(tour_record, TourDate.iter_by_band(find_band(args.band).id, args.history))
+
+def tours_by_location(args):
+    return TOUR_FIELDS, map(tour_record, TourDate.iter_by_location(args.location, args.history))
+
+def tours_by_venue(args):
+    return TOUR_FIELDS, map(tour_record, TourDate.iter_by_venue(args.venue, args.history))
+
+def tours_show(args):
+    return TOUR_FIELDS, [tour_record(find_tour(args.tour_id))]
+
+def tours_create(args):
+    band = find_band(args.band)
+    return TOUR_FIELDS, [tour_record(TourDate.create(band.id, args.location, args.date, args.venue))]
+
+def tours_update(args):
+    tour = find_tour(args.tour_id)
+    return TOUR_FIELDS, [tour_record(TourDate.update(tour.id, args.location, args.date, args.venue))]
+
+def tours_delete(args):
+    tour = find_tour(args.tour_id)
+    record = tour_record(tour)
+    if not TourDate.delete(tour.id):
+        raise CommandError(f"Tour date '{args.tour_id}' not found.")
+    return TOUR_FIELDS, [record]
+
+def tours_free(args):
+    kind, key = availability_target(args)
+    windows = TourDate.availability.free_windows(kind, key, args.start, args.end, args.min_days)
+    return ("first", "last", "days"), [
+        {"first": first.isoformat(), "last": last.isoformat(), "days": (last - first).days + 1}
+        for first, last in windows
+    ]
+
+def tours_conflicts(args):
+    band = find_band(args.band) if args.band else None
+    stops = []
+    for stop in args.stops:
+        venue, _, day = stop.rpartition("@")
+        if not venue or not day:
+            raise CommandError(f"Invalid stop '{stop}'. Use VENUE@YYYY-MM-DD.")
+        stops.append((venue, day))
+
+    conflicts = TourDate.availability.conflicts(stops, band.id if band else None)
+    return ("stop", "venue", "date", "reason", "tour_id"), [
+        {"stop": index + 1, "venue": stops[index][0], "date": stops[index][1], "reason": reason, "tour_id": tour_id}
+        for index, reason, tour_id in conflicts
+    ]
+
+def availability_target(args):
+    if args.venue:
+        return "venue", args.venue
+    if args.location:
+        return "location", args.location
+    if args.band:
+        return "band", find_band(args.band).id
+    raise CommandError("Pass one of --venue, --location or --band.")
+
+def tours_archive(args):
+    return ("archived",), [{"archived": TourDate.archive_before(args.before, args.batch_size)}]
+
+def tours_sweep_orphans(args):
+    return ("deleted",), [{"deleted": TourDate.delete_orphans()}]
+
+def search_terms(args):
+    kinds = [args.kind] if args.kind else SEARCH_KINDS
+    return ("kind", "term", "ref", "uses", "score"), [match._asdict() for match in search(args.text, kinds, args.limit)]
+
+def stats_list(args):
+    return SUMMARY_FIELDS, map(summary_record, stats.summaries(args.kind, args.sort, args.limit))
+
+def stats_rebuild(args):
+    return tuple(stats.TABLES), [stats.rebuild()]
+
+def change_record(change):
+    return change._asdict()
+
+def changes_tail(args):
+    # With --consumer, starts from that consumer's checkpoint and moves it
+    # past everything printed.
+    tables = args.table or None
+    if args.consumer:
+        tailer = change_log.ChangeTailer(args.consumer, tables, args.limit, start=args.since)
+        changes = tailer.poll()
+        if changes:
+            tailer.checkpoint(changes[-1].seq)
+    else:
+        changes = change_log.changes_since(args.since, args.limit, tables)
+    return CHANGE_FIELDS, map(change_record, changes)
+
+def changes_compact(args):
+    return ("deleted",), [{"deleted": change_log.compact(args.upto)}]
+
+def changes_status(args):
+    status = change_log.status()
+    del status["consumers"]
+    return tuple(status), [status]
+
+def changes_consumers(args):
+    return ("consumer", "seq", "lag", "updated_at"), change_log.status()["consumers"]
+
+def changes_forget(args):
+    if not change_log.forget_consumer(args.consumer):
+        raise CommandError(f"No checkpoint for consumer '{args.consumer}'.")
+    return ("consumer",), [{"consumer": args.consumer}]
+
+def replica_save(args):
+    return ("image", "change_seq", "bytes"), [replica.save_image(args.image)]
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Run tour schedule operations without the menus.")
+    parser.add_argument("--format", choices=["json", "tsv"], default="json", help="output format (default: json)")
+    parser.add_argument("--batch", action="store_true", help="read one command per line from stdin and run them all in this process")
+
+    groups = parser.add_subparsers(dest="group", metavar="{bands,tours,search,stats,changes,replica}")
+
+    bands = groups.add_parser("bands", help="band operations").add_subparsers(dest="action", metavar="ACTION", required=True)
+    bands.add_parser("list").set_defaults(handler=bands_list)
+    show = bands.add_parser("show")
+    show.add_argument("band", help="band name or ID")
+    show.set_defaults(handler=bands_show)
+    create = bands.add_parser("create")
+    create.add_argument("name")
+    create.add_argument("genre")
+    create.set_defaults(handler=bands_create)
+    update = bands.add_parser("update")
+    update.add_argument("band", help="band name or ID")
+    update.add_argument("--name")
+    update.add_argument("--genre")
+    update.set_defaults(handler=bands_update)
+    delete = bands.add_parser("delete")
+    delete.add_argument("band", help="band name or ID")
+    delete.set_defaults(handler=bands_delete)
+    delete_many = bands.add_parser("delete-many", help="delete several bands and their tour dates in one transaction")
+    delete_many.add_argument("bands", nargs="+", help="band names or IDs")
+    delete_many.set_defaults(handler=bands_delete_many)
+
+    tours = groups.add_parser("tours", help="tour date operations").add_subparsers(dest="action", metavar="ACTION", required=True)
+    listing = tours.add_parser("list")
+    listing.set_defaults(handler=tours_list)
+    by_band = tours.add_parser("by-band")
+    by_band.add_argument("band", help="band name or ID")
+    by_band.set_defaults(handler=tours_by_band)
+    by_location = tours.add_parser("by-location")
+    by_location.add_argument("location")
+    by_location.set_defaults(handler=tours_by_location)
+    by_venue = tours.add_parser("by-venue")
+    by_venue.add_argument("venue")
+    by_venue.set_defaults(handler=tours_by_venue)
+    for finder in (listing, by_band, by_location, by_venue):
+        finder.add_argument("--history", action="store_true", help="include archived past tour dates")
+    show = tours.add_parser("show")
+    show.add_argument("tour_id")
+    show.set_defaults(handler=tours_show)
+    create = tours.add_parser("create")
+    create.add_argument("band", help="band name or ID")
+    create.add_argument("location")
+    create.add_argument("date", help="YYYY-MM-DD")
+    create.add_argument("venue")
+    create.set_defaults(handler=tours_create)
+    update = tours.add_parser("update")
+    update.add_argument("tour_id")
+    update.add_argument("--location")
+    update.add_argument("--date", help="YYYY-MM-DD")
+    update.add_argument("--venue")
+    update.set_defaults(handler=tours_update)
+    delete = tours.add_parser("delete")
+    delete.add_argument("tour_id")
+    delete.set_defaults(handler=tours_delete)
+    free = tours.add_parser("free", help="free date windows for a venue, location or band")
+    free.add_argument("start", help="YYYY-MM-DD")
+    free.add_argument("end", help="YYYY-MM-DD, inclusive")
+    free.add_argument("--venue")
+    free.add_argument("--location")
+    free.add_argument("--band", help="band name or ID")
+    free.add_argument("--min-days", type=int, default=1, help="only report windows at least this long")
+    free.set_defaults(handler=tours_free)
+    conflicts = tours.add_parser("conflicts", help="check a proposed itinerary against existing bookings")
+    conflicts.add_argument("stops", nargs="+", help="VENUE@YYYY-MM-DD")
+    conflicts.add_argument("--band", help="band name or ID; also flags days the band is already playing")
+    conflicts.set_defaults(handler=tours_conflicts)
+    tours.add_parser("sweep-orphans", help="delete tour dates whose band no longer exists").set_defaults(handler=tours_sweep_orphans)
+    archive = tours.add_parser("archive", help="move past tour dates to the archive database")
+    archive.add_argument("--before", help="YYYY-MM-DD, no later than today; defaults to today")
+    archive.add_argument("--batch-size", type=int, default=5000, help="tour dates moved per transaction")
+    archive.set_defaults(handler=tours_archive)
+
+    search_parser = groups.add_parser("search", help="ranked, typo-tolerant search over band names, locations and venues")
+    search_parser.add_argument("text")
+    search_parser.add_argument("--kind", choices=SEARCH_KINDS)
+    search_parser.add_argument("--limit", type=int, default=10)
+    search_parser.set_defaults(handler=search_terms)
+
+    stats_parser = groups.add_parser("stats", help="per-band, per-venue and per-location summaries")
+    summaries = stats_parser.add_subparsers(dest="action", metavar="ACTION", required=True)
+    for plural, kind in (("bands", "band"), ("venues", "venue"), ("locations", "location")):
+        listing = summaries.add_parser(plural, help=f"date counts and next and last show per {kind}")
+        listing.add_argument("--sort", choices=sorted(stats.ORDERS), default="tours")
+        listing.add_argument("--limit", type=int, default=20)
+        listing.set_defaults(handler=stats_list, kind=kind)
+    summaries.add_parser("rebuild", help="recompute the summaries from tour_dates").set_defaults(handler=stats_rebuild)
+
+    changes = groups.add_parser("changes", help="the change log of inserts, updates and deletes").add_subparsers(dest="action", metavar="ACTION", required=True)
+    tail = changes.add_parser("tail", help="changes after a sequence number, oldest first")
+    tail.add_argument("--since", type=int, default=0, help="last sequence number already seen")
+    tail.add_argument("--limit", type=int, default=change_log.BATCH_SIZE)
+    tail.add_argument("--table", action="append", choices=change_log.TABLES, help="only changes to this table; repeatable")
+    tail.add_argument("--consumer", help="resume from this consumer's checkpoint and advance it")
+    tail.set_defaults(handler=changes_tail)
+    compact = changes.add_parser("compact", help="drop changes every consumer has checkpointed past")
+    compact.add_argument("--upto", type=int, help="drop changes up to this sequence number instead; needed when no consumer has a checkpoint")
+    compact.set_defaults(handler=changes_compact)
+    changes.add_parser("status", help="log size and compaction horizon").set_defaults(handler=changes_status)
+    changes.add_parser("consumers", help="consumer checkpoints and how far each lags behind").set_defaults(handler=changes_consumers)
+    forget = changes.add_parser("forget", help="remove a consumer's checkpoint so it no longer holds back compaction")
+    forget.add_argument("consumer")
+    forget.set_defaults(handler=changes_forget)
+
+    replica_parser = groups.add_parser("replica", help="images for read-only in-memory serving").add_subparsers(dest="action", metavar="ACTION", required=True)
+    save = replica_parser.add_parser("save", help="write a compact image of the schedule to warm-start replicas from")
+    save.add_argument("image")
+    save.set_defaults(handler=replica_save)
+
+    return parser
+
+def tsv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        value = json.dumps(value)
+    return str(value).replace("\t", " ").replace("\n", " ")
+
+def write_json(out, records):
+    out.write('{"ok": true, "data": [')
+    for index, record in enumerate(records):
+        if index:
+            out.write(", ")
+        out.write(json.dumps(record))
+    out.write("]}\n")
+
+def write_tsv(out, fields, records):
+    out.write("\t".join(fields) + "\n")
+    for record in records:
+        out.write("\t".join(tsv_value(record[field]) for field in fields) + "\n")
+
+def write_error(out, output_format, message):
+    if output_format == "json":
+        out.write(json.dumps({"ok": False, "error": message}) + "\n")
+    else:
+        out.write(f"error\t{tsv_value(message)}\n")
+
+def run(args, output_format, out=None, buffered=False):
+    # Records are written out as they are read. A batch buffers each
+    # command's output instead, so that an error raised part way through
+    # replaces the document rather than leaving half of one in the stream.
+    # Outside a batch the cut-off output is followed by an error document.
+    out = out or sys.stdout
+    try:
+        fields, records = args.handler(args)
+    except COMMAND_ERRORS as e:
+        write_error(out, output_format, str(e))
+        return False
+
+    target = io.StringIO() if buffered else out
+    try:
+        if output_format == "json":
+            write_json(target, records)
+        else:
+            write_tsv(target, fields, records)
+    except COMMAND_ERRORS as e:
+        if not buffered:
+            out.write("\n")
+        write_error(out, output_format, str(e))
+        return False
+    if buffered:
+        out.write(target.getvalue())
+    return True
+
+def run_batch(parser, output_format, lines, out=None):
+    out = out or sys.stdout
+    failures = 0
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            args = parser.parse_args(shlex.split(line))
+            if not getattr(args, "handler", None):
+                raise CommandError(f"Incomplete command: {line}")
+        except SystemExit:
+            write_error(out, output_format, f"Invalid command: {line}")
+            failures += 1
+            continue
+        except COMMAND_ERRORS as e:
+            write_error(out, output_format, str(e))
+            failures += 1
+            continue
+
+        if not run(args, output_format, out, buffered=True):
+            failures += 1
+        if output_format == "tsv":
+            out.write("\n")
+        out.flush()
+
+    return failures
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        # Commands inside a batch inherit the outer --format.
+        return 1 if run_batch(parser, args.format, sys.stdin) else 0
+
+    if not getattr(args, "handler", None):
+        parser.print_usage(sys.stderr)
+        return 2
+
+    return 0 if run(args, args.format) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# lib/date_picker.py
+
+import os
+import sys
+from datetime import date, datetime
+
+# tkinter and tkcalendar are only imported the first time a date is picked,
+# and a single hidden Tk root is shared by every picker window after that.
+_root = None
+_gui_failed = False
+
+DATE_FORMATS = ("%m/%d/%y", "%Y-%m-%d")
+
+def gui_available():
+    if _gui_failed or os.environ.get("TOUR_SCHEDULE_NO_GUI"):
+        return False
+    if sys.platform.startswith("linux"):
+        return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+    return True
+
+def get_root():
+    global _root, _gui_failed
+
+    if _root is None:
+        import tkinter as tk
+        try:
+            _root = tk.Tk()
+        except tk.TclError:
+            _gui_failed = True
+            raise
+        _root.withdraw()
+
+    return _root
+
+def select_date_gui():
+    import tkinter as tk
+    from tkcalendar import Calendar
+
+    root = get_root()
+    selected_date = None
+    today = date.today()
+
+    window = tk.Toplevel(root)
+    window.title("Select a Date")
+
+    cal = Calendar(window, selectmode='day', year=today.year, month=today.month, day=today.day)
+    cal.pack(pady=20)
+
+    def grab_date():
+        nonlocal selected_date
+        selected_date = cal.get_date()
+        window.destroy()
+
+    select_btn = tk.Button(window, text="Select", command=grab_date)
+    select_btn.pack(pady=20)
+
+    window.protocol("WM_DELETE_WINDOW", window.destroy)
+    root.wait_window(window)
+
+    return selected_date
+
+def select_date_text():
+    while True:
+        value = input("Enter date (YYYY-MM-DD, leave blank to skip): ").strip()
+        if not value:
+            return None
+        for date_format in DATE_FORMATS:
+            try:
+                datetime.strptime(value, date_format)
+                return value
+            except ValueError:
+                pass
+        print(f"'{value}' is not a valid date.")
+
+def select_date():
+    global _gui_failed
+
+    if gui_available():
+        try:
+            return select_date_gui()
+        except ImportError as e:
+            _gui_failed = True
+            print(f"Calendar unavailable ({e}); falling back to text entry.")
+        except Exception as e:
+            if not _gui_failed:
+                raise
+            print(f"Calendar unavailable ({e}); falling back to text entry.")
+    return select_date_text()
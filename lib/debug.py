@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 # lib/debug.py
 
-from models.__init__ import CONN, CURSOR
+from models.connection import get_connection
 import ipdb
 
+CONN = get_connection()
+
 
 ipdb.set_trace()
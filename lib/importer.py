@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# lib/importer.py
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from models.connection import get_connection, touch, transaction
+from models.tour_date import TourDate
+from models.validators import (
+    validate_band_name,
+    validate_genre,
+    validate_location,
+    validate_tour_date,
+    validate_venue,
+)
+
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_CHUNK_SIZE = 20000
+
+def read_rows(path, file_format=None):
+    file_format = file_format or os.path.splitext(path)[1].lstrip(".").lower()
+
+    with open(path, newline="", encoding="utf-8") as feed:
+        if file_format == "csv":
+            # Line 1 is the header, so the first record is line 2.
+            for line_number, row in enumerate(csv.DictReader(feed), start=2):
+                yield line_number, row
+        elif file_format in ("jsonl", "ndjson"):
+            for line_number, line in enumerate(feed, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, e
+                    continue
+                if not isinstance(row, dict):
+                    row = ValueError(f"expected a JSON object, got {type(row).__name__}")
+                yield line_number, row
+        else:
+            raise ValueError(f"Unsupported feed format '{file_format}'. Use csv or jsonl.")
+
+def required(row, field):
+    value = row.get(field)
+    if value is None:
+        raise ValueError(f"Missing '{field}'.")
+    return str(value)
+
+def parse_row(parse, row):
+    try:
+        if isinstance(row, Exception):
+            raise ValueError(f"Unreadable row: {row}")
+        return parse(row)
+    except (ValueError, TypeError) as e:
+        return ValueError(str(e))
+
+def parse_chunk(parse, rows):
+    # Runs in a worker process. Errors come back as values so that one bad
+    # row does not fail the whole chunk.
+    return [parse_row(parse, row) for row in rows]
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.rejected = []
+        self.elapsed = 0.0
+
+    def reject(self, line_number, reason, row):
+        self.rejected.append((line_number, reason, row))
+
+    def rows_per_second(self):
+        total = self.imported + len(self.rejected)
+        return total / self.elapsed if self.elapsed else 0.0
+
+class Importer:
+    # Validation is split in two. parse() checks a row on its own and needs
+    # nothing but the row, so parallel imports run it in worker processes.
+    # check() compares the parsed row with the database and with the rows
+    # accepted before it (taken names, booked venues); it always runs here,
+    # in feed order, so duplicates are caught across shards and the first
+    # occurrence wins exactly as in a serial import.
+    table = None
+    insert_sql = None
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.conn = get_connection()
+        self.batch_size = max(1, batch_size)
+        self.preload()
+
+    def preload(self):
+        raise NotImplementedError
+
+    @staticmethod
+    def parse(row):
+        raise NotImplementedError
+
+    def check(self, values):
+        raise NotImplementedError
+
+    def clean(self, row):
+        return self.check(self.parse(row))
+
+    def run(self, rows, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
+        report = ImportReport()
+        started = time.perf_counter()
+        batch = []
+
+        for line_number, row, values in self.parsed(rows, workers, chunk_size):
+            try:
+                if isinstance(values, Exception):
+                    raise values
+                batch.append((line_number, row, self.check(values)))
+            except (ValueError, TypeError) as e:
+                report.reject(line_number, str(e), row)
+                continue
+
+            if len(batch) >= self.batch_size:
+                self.flush(batch, report)
+                batch = []
+
+        if batch:
+            self.flush(batch, report)
+
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def parsed(self, rows, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
+        # (line_number, row, values) in feed order, where values is what
+        # parse() returned or the error that rejected the row. With several
+        # workers, chunks of the feed are parsed in a process pool while this
+        # process checks and writes earlier chunks. Only a few chunks per
+        # worker are in flight at once, so memory stays flat on huge feeds.
+        if workers <= 1:
+            for line_number, row in rows:
+                yield line_number, row, parse_row(self.parse, row)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in chunked(rows, chunk_size):
+                pending.append((chunk, pool.submit(parse_chunk, self.parse, [row for _, row in chunk])))
+                if len(pending) >= workers * 2:
+                    yield from self._results(*pending.popleft())
+            while pending:
+                yield from self._results(*pending.popleft())
+
+    @staticmethod
+    def _results(chunk, future):
+        for (line_number, row), values in zip(chunk, future.result()):
+            yield line_number, row, values
+
+    def flush(self, batch, report):
+        try:
+            self.write([values for _, _, values in batch])
+            report.imported += len(batch)
+        except sqlite3.IntegrityError:
+            # Another writer got in after preload(), taking a name or booking
+            # a venue. The batch was rolled back; it is written again row by
+            # row, each in its own savepoint, and only the clashing rows are
+            # rejected.
+            with transaction():
+                for line_number, row, values in batch:
+                    try:
+                        self.write([values])
+                        report.imported += 1
+                    except sqlite3.IntegrityError as e:
+                        report.reject(line_number, f"Rejected by the database: {e}", row)
+
+    def write(self, batch):
+        with transaction() as conn:
+            conn.executemany(self.insert_sql, batch)
+            touch(self.table)
+
+class BandImporter(Importer):
+    table = "bands"
+    insert_sql = "INSERT INTO bands (name, genre) VALUES (?, ?)"
+
+    def preload(self):
+        self.names = {name for (name,) in self.conn.execute("SELECT name FROM bands")}
+
+    @staticmethod
+    def parse(row):
+        return (validate_band_name(required(row, "name")), validate_genre(required(row, "genre")))
+
+    def check(self, values):
+        name = values[0]
+        if name in self.names:
+            raise ValueError(f"Band name '{name}' is already taken.")
+        self.names.add(name)
+        return values
+
+class TourDateImporter(Importer):
+    table = "tour_dates"
+    insert_sql = "INSERT INTO tour_dates (band_id, location, venue, day) VALUES (?, ?, ?, ?)"
+
+    def preload(self):
+        self.band_ids = {}
+        for band_id, name in self.conn.execute("SELECT id, name FROM bands"):
+            self.band_ids[name] = band_id
+            self.band_ids[str(band_id)] = band_id
+        self.bookings = set(self.conn.execute("SELECT venue, day FROM tour_dates"))
+
+    @staticmethod
+    def parse(row):
+        band = str(row.get("band_id") or row.get("band") or "").strip().lower()
+        location = validate_location(required(row, "location"))
+        day = TourDate.day_of(validate_tour_date(required(row, "date")))
+        venue = validate_venue(required(row, "venue"))
+        return (band, location, venue, day)
+
+    def check(self, values):
+        band, location, venue, day = values
+        if band not in self.band_ids:
+            raise ValueError(f"Band '{band}' not found.")
+        if (venue, day) in self.bookings:
+            raise ValueError("This venue is already booked for that date.")
+        self.bookings.add((venue, day))
+        return (self.band_ids[band], location, venue, day)
+
+    def write(self, batch):
+        super().write(batch)
+        TourDate.availability.invalidate()
+
+IMPORTERS = {
+    "bands": BandImporter,
+    "tours": TourDateImporter,
+}
+
+def write_rejects(report, path):
+    with open(path, "w", encoding="utf-8") as rejects:
+        for line_number, reason, row in report.rejected:
+            if isinstance(row, Exception):
+                row = None
+            rejects.write(json.dumps({"line": line_number, "reason": reason, "row": row}) + "\n")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import bands or tour dates from a CSV or JSONL feed.")
+    parser.add_argument("kind", choices=sorted(IMPORTERS), help="what the feed contains")
+    parser.add_argument("path", help="feed file (.csv or .jsonl)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="override the format implied by the file extension")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows written per transaction")
+    parser.add_argument("--rejects", help="write rejected rows to this JSONL file instead of listing them")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes validating the feed in parallel (0 for one per core)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows handed to a worker at a time")
+    args = parser.parse_args(argv)
+
+    workers = args.workers if args.workers > 0 else os.cpu_count() or 1
+    importer = IMPORTERS[args.kind](batch_size=args.batch_size)
+    report = importer.run(read_rows(args.path, args.format), workers, max(1, args.chunk_size))
+
+    print(f"Imported {report.imported} {args.kind}, rejected {len(report.rejected)} "
+          f"in {report.elapsed:.2f}s ({report.rows_per_second():.0f} rows/s).")
+
+    if args.rejects:
+        write_rejects(report, args.rejects)
+        print(f"Rejected rows written to {args.rejects}.")
+    else:
+        for line_number, reason, _ in report.rejected:
+            print(f"Line {line_number}: {reason}", file=sys.stderr)
+
+    return 1 if report.rejected else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from models.band import Band
+from models.connection import close_connection
+from models.tour_date import TourDate
+from models.writer import WriteQueue
+
+# Async facade over the models for asyncio services. Calls run on a bounded
+# pool of worker threads, each with its own SQLite connection (connections
+# are per thread), so the event loop never blocks on the database.
+# Identical reads that are already in flight share one query: the second
+# caller awaits the first caller's result instead of running it again.
+# Writes go through a WriteQueue, so concurrent writes share transactions
+# instead of queueing for SQLite's write lock.
+
+DEFAULT_WORKERS = 4
+
+BAND_READS = ("all", "find_by_id", "find_by_name")
+BAND_WRITES = ("create", "update", "delete", "delete_many")
+
+TOUR_DATE_READS = (
+    "all", "find_by_id", "find_by_band", "find_by_location", "find_by_venue",
+    "find_by_venue_and_date", "all_chronological", "page",
+)
+TOUR_DATE_WRITES = ("create", "update", "update_many", "delete", "delete_orphans")
+
+class AsyncModel:
+    # await schedule.tour_dates.find_by_band(3) runs TourDate.find_by_band(3)
+    # on the pool. Only list-returning methods are exposed; the iter_*
+    # generators would hold a cursor open across awaits.
+    def __init__(self, schedule, model, reads, writes):
+        self._schedule = schedule
+        self._model = model
+        self._reads = reads
+        self._writes = writes
+
+    def __getattr__(self, name):
+        if name in self._reads:
+            return partial(self._schedule.read, (self._model.__name__, name), getattr(self._model, name))
+        if name in self._writes:
+            return partial(self._schedule.write, getattr(self._model, name))
+        raise AttributeError(f"{self._model.__name__} has no async method '{name}'.")
+
+class AsyncSchedule:
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tour-schedule-db")
+        self._in_flight = {}
+        self.writer = WriteQueue()
+        self.submitted = 0
+        self.coalesced = 0
+        self.bands = AsyncModel(self, Band, BAND_READS, BAND_WRITES)
+        self.tour_dates = AsyncModel(self, TourDate, TOUR_DATE_READS, TOUR_DATE_WRITES)
+
+    async def run(self, function, *args, **kwargs):
+        self.submitted += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, partial(function, *args, **kwargs))
+
+    async def read(self, key, function, *args, **kwargs):
+        # Results handed to coalesced callers are the same objects, so callers
+        # must treat them as read-only.
+        try:
+            key = (key, args, tuple(sorted(kwargs.items())))
+            hash(key)
+        except TypeError:
+            return await self.run(function, *args, **kwargs)
+
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self.run(function, *args, **kwargs))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # One caller being cancelled must not cancel the shared query.
+        return await asyncio.shield(future)
+
+    async def write(self, function, *args, **kwargs):
+        self.submitted += 1
+        return await asyncio.wrap_future(self.writer.submit(function, *args, **kwargs))
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+            "writer": self.writer.stats(),
+        }
+
+    async def close(self):
+        # Each worker closes its own connection before the pool goes away.
+        loop = asyncio.get_running_loop()
+        barrier = threading.Barrier(self.workers, timeout=5)
+
+        def close_worker():
+            close_connection()
+            try:
+                barrier.wait()
+            except threading.BrokenBarrierError:
+                pass
+
+        await asyncio.gather(*(loop.run_in_executor(self._pool, close_worker) for _ in range(self.workers)))
+        await loop.run_in_executor(self._pool, self.writer.close)
+        self._pool.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
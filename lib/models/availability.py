@@ -0,0 +1,249 @@
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from models.connection import check_external_changes, stream
+
+KINDS = ("band", "location", "venue")
+
+def day_ordinal(value):
+    if isinstance(value, int):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.toordinal()
+    return date.fromisoformat(str(value).strip()[:10]).toordinal()
+
+def day_from_ordinal(ordinal):
+    return date.fromordinal(ordinal)
+
+def normalize_key(kind, key):
+    if kind == "band":
+        return int(key)
+    if kind in ("location", "venue"):
+        return sys.intern(str(key).strip().lower())
+    raise ValueError(f"Cannot check availability by '{kind}'.")
+
+class Occupancy:
+    # The days one band, location or venue is booked, kept as parallel arrays
+    # of day ordinals and tour ids sorted by day, so any date range is two
+    # bisects away.
+    __slots__ = ("days", "tour_ids")
+
+    def __init__(self):
+        self.days = array("l")
+        self.tour_ids = array("l")
+
+    def __len__(self):
+        return len(self.days)
+
+    def append(self, day, tour_id):
+        self.days.append(day)
+        self.tour_ids.append(tour_id)
+
+    def add(self, day, tour_id):
+        index = bisect_right(self.days, day)
+        self.days.insert(index, day)
+        self.tour_ids.insert(index, tour_id)
+
+    def remove(self, day, tour_id):
+        index = bisect_left(self.days, day)
+        while index < len(self.days) and self.days[index] == day:
+            if self.tour_ids[index] == tour_id:
+                del self.days[index]
+                del self.tour_ids[index]
+                return
+            index += 1
+
+    def between(self, first, last):
+        start = bisect_left(self.days, first)
+        stop = bisect_right(self.days, last)
+        return list(zip(self.days[start:stop], self.tour_ids[start:stop]))
+
+    def on(self, day):
+        start = bisect_left(self.days, day)
+        stop = bisect_right(self.days, day, start)
+        return list(self.tour_ids[start:stop])
+
+class AvailabilityIndex:
+    # In-memory occupancy of every band, location and venue, built from one
+    # scan of tour_dates on first use and then kept current by the TourDate
+    # write paths. It answers planning questions without touching SQLite; the
+    # UNIQUE (venue, day) index is still what actually prevents double-booking.
+    # Commits from other connections are noticed through PRAGMA data_version
+    # and drop the index, as does invalidate(); the next query reloads.
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._tours = None
+        self._occupancy = None
+
+    def _load(self):
+        tours = {}
+        occupancy = {kind: {} for kind in KINDS}
+
+        rows = stream("SELECT id, band_id, location, venue, day FROM tour_dates ORDER BY day, id")
+        for tour_id, band_id, location, venue, day in rows:
+            entry = (band_id, sys.intern(location), sys.intern(venue), day_ordinal(day))
+            tours[tour_id] = entry
+            for kind, key in zip(KINDS, entry):
+                keyed = occupancy[kind].get(key)
+                if keyed is None:
+                    keyed = occupancy[kind][key] = Occupancy()
+                keyed.append(entry[3], tour_id)
+
+        self._tours = tours
+        self._occupancy = occupancy
+
+    def _loaded(self):
+        check_external_changes()
+        if self._tours is None:
+            self._load()
+        return self._occupancy
+
+    def refresh(self):
+        with self._lock:
+            self._load()
+
+    def invalidate(self):
+        with self._lock:
+            self._tours = None
+            self._occupancy = None
+
+    def put(self, tour_id, band_id, location, venue, day):
+        with self._lock:
+            if self._tours is None:
+                return
+            self._remove(tour_id)
+            entry = (band_id, normalize_key("location", location), normalize_key("venue", venue), day_ordinal(day))
+            self._tours[tour_id] = entry
+            for kind, key in zip(KINDS, entry):
+                keyed = self._occupancy[kind].get(key)
+                if keyed is None:
+                    keyed = self._occupancy[kind][key] = Occupancy()
+                keyed.add(entry[3], tour_id)
+
+    def discard(self, tour_id):
+        with self._lock:
+            if self._tours is not None:
+                self._remove(tour_id)
+
+    def discard_band(self, band_id):
+        with self._lock:
+            if self._tours is None:
+                return
+            keyed = self._occupancy["band"].get(band_id)
+            for tour_id in list(keyed.tour_ids) if keyed else []:
+                self._remove(tour_id)
+
+    def _remove(self, tour_id):
+        entry = self._tours.pop(tour_id, None)
+        if entry is None:
+            return
+        for kind, key in zip(KINDS, entry):
+            keyed = self._occupancy[kind].get(key)
+            if keyed is not None:
+                keyed.remove(entry[3], tour_id)
+                if not keyed:
+                    del self._occupancy[kind][key]
+
+    def _get(self, kind, key):
+        key = normalize_key(kind, key)
+        with self._lock:
+            return self._loaded()[kind].get(key)
+
+    def bookings(self, kind, key, start, end):
+        # (date, tour_id) pairs booked for the key between start and end,
+        # both inclusive.
+        first, last = day_ordinal(start), day_ordinal(end)
+        with self._lock:
+            keyed = self._get(kind, key)
+            booked = keyed.between(first, last) if keyed else []
+        return [(day_from_ordinal(day), tour_id) for day, tour_id in booked]
+
+    def is_free(self, kind, key, day):
+        with self._lock:
+            keyed = self._get(kind, key)
+            return not keyed or not keyed.on(day_ordinal(day))
+
+    def free_days(self, kind, key, start, end):
+        return [day for first, last in self.free_windows(kind, key, start, end)
+                for day in self._days(first, last)]
+
+    def free_windows(self, kind, key, start, end, min_days=1):
+        # Maximal runs of consecutive unbooked days, as (first, last) dates.
+        first, last = day_ordinal(start), day_ordinal(end)
+        with self._lock:
+            keyed = self._get(kind, key)
+            booked = sorted({day for day, _ in keyed.between(first, last)}) if keyed else []
+
+        windows = []
+        cursor = first
+        for day in booked + [last + 1]:
+            if day - cursor >= min_days:
+                windows.append((day_from_ordinal(cursor), day_from_ordinal(day - 1)))
+            cursor = day + 1
+        return windows
+
+    def busy_windows(self, kind, key, start, end):
+        # Maximal runs of consecutive booked days, as (first, last) dates.
+        first, last = day_ordinal(start), day_ordinal(end)
+        with self._lock:
+            keyed = self._get(kind, key)
+            booked = sorted({day for day, _ in keyed.between(first, last)}) if keyed else []
+
+        windows = []
+        for day in booked:
+            if windows and windows[-1][1] == day - 1:
+                windows[-1][1] = day
+            else:
+                windows.append([day, day])
+        return [(day_from_ordinal(first), day_from_ordinal(last)) for first, last in windows]
+
+    def bands_in(self, location, start, end):
+        first, last = day_ordinal(start), day_ordinal(end)
+        with self._lock:
+            keyed = self._get("location", location)
+            if not keyed:
+                return []
+            return sorted({self._tours[tour_id][0] for _, tour_id in keyed.between(first, last)})
+
+    def conflicts(self, stops, band_id=None):
+        # Checks a whole proposed itinerary, a sequence of (venue, date) stops,
+        # in one call. Returns (stop index, reason, tour_id) for every clash
+        # with an existing booking, or with an earlier stop of the same
+        # itinerary (tour_id None). Passing band_id also rejects days on which
+        # the band is already playing elsewhere.
+        found = []
+        claimed_venues = {}
+        claimed_days = {}
+
+        with self._lock:
+            occupancy = self._loaded()
+            band = occupancy["band"].get(int(band_id)) if band_id is not None else None
+
+            for index, (venue, day) in enumerate(stops):
+                venue = normalize_key("venue", venue)
+                day = day_ordinal(day)
+
+                keyed = occupancy["venue"].get(venue)
+                for tour_id in keyed.on(day) if keyed else []:
+                    found.append((index, "venue booked", tour_id))
+                if (venue, day) in claimed_venues:
+                    found.append((index, "venue repeated in itinerary", None))
+                claimed_venues.setdefault((venue, day), index)
+
+                if band_id is not None:
+                    for tour_id in band.on(day) if band else []:
+                        found.append((index, "band already playing", tour_id))
+                    if day in claimed_days:
+                        found.append((index, "day repeated in itinerary", None))
+                    claimed_days.setdefault(day, index)
+
+        return found
+
+    @staticmethod
+    def _days(first, last):
+        day = first
+        while day <= last:
+            yield day
+            day += timedelta(days=1)
@@ -1,24 +1,28 @@
-from models.__init__ import CONN, CURSOR
+import sqlite3
+from models.connection import cached_query, cached_stream, check_external_changes, query, register_cache, touch, transaction
+from models.identity_map import IdentityMap
+from models.validators import validate_band_name, validate_genre
 
 class Band:
+    __slots__ = ("id", "_name", "_genre")
+
+    identity_map = IdentityMap(maxsize=10000)
+
     def __init__(self, name, genre):
+        self.id = None
         self.name = name
         self.genre = genre
 
+    def __repr__(self):
+        return f"<Band {self.id}: {self.name} ({self.genre})>"
+
     @property
     def name(self):
         return self._name
 
     @name.setter
     def name(self, value):
-
-        if Band.find_by_name(value):
-            raise ValueError(f"Band name '{value}' is already taken.")
-        if not (0 < len(value) <= 50):
-            raise ValueError("Band name must be between 1 and 50 characters.")
-        if not value.strip():
-            raise ValueError("Band name cannot be empty.")
-        self._name = value.strip().lower()
+        self._name = validate_band_name(value)
 
     @property
     def genre(self):
@@ -26,57 +30,112 @@ class Band:
 
     @genre.setter
     def genre(self, value):
-        if not (0 < len(value) <= 30):
-            raise ValueError("Genre must be between 1 and 30 characters.")
-        if not value.strip():
-            raise ValueError("Genre cannot be empty.")
-        self._genre = value.strip().lower()
+        self._genre = validate_genre(value)
+
+    @classmethod
+    def from_row(cls, row):
+        # Rows are trusted database state, so hydration skips the setters and
+        # refreshes the mapped instance in place instead of building a new one.
+        band_id, name, genre = row
+        band = cls.identity_map.get(band_id)
+        if band is None:
+            band = cls.__new__(cls)
+            band.id = band_id
+            cls.identity_map.add(band_id, band)
+        band._name = name
+        band._genre = genre
+        return band
 
     @classmethod
     def all(cls):
-        return CURSOR.execute("SELECT * FROM bands").fetchall()
+        return list(cls.iter_all())
+
+    @classmethod
+    def iter_all(cls):
+        return cached_stream("SELECT id, name, genre FROM bands", tables=("bands",), row_factory=cls.from_row)
 
     @classmethod
     def create(cls, name, genre):
         band = cls(name, genre)
-        CURSOR.execute("INSERT INTO bands (name, genre) VALUES (?, ?)", (band.name, band.genre))
-        CONN.commit()
-        print(f"Band '{band.name}' created successfully.")
+        try:
+            with transaction() as conn:
+                band.id = conn.execute("INSERT INTO bands (name, genre) VALUES (?, ?)", (band.name, band.genre)).lastrowid
+                touch("bands")
+        except sqlite3.IntegrityError as e:
+            raise cls._translate(e, name) from None
+        cls.identity_map.add(band.id, band)
+        return band
 
     @classmethod
     def update(cls, band_id, new_name=None, new_genre=None):
         band = cls.find_by_id(band_id)
-        
-        name_to_update = new_name.strip().lower() if new_name else band[1].strip().lower()
-        genre_to_update = new_genre.strip().lower() if new_genre else band[2].strip().lower()
 
-        if new_name and new_name.strip() and new_name.strip().lower() != band[1].strip().lower():
-            if Band.find_by_name(new_name.strip().lower()):
-                raise ValueError(f"Band name '{new_name}' is already taken.")
+        name_to_update = validate_band_name(new_name) if new_name else band.name
+        genre_to_update = validate_genre(new_genre) if new_genre else band.genre
 
-        CURSOR.execute("UPDATE bands SET name = ?, genre = ? WHERE id = ?", 
-                    (name_to_update, genre_to_update, band_id))
-        CONN.commit()
-        print(f"Band '{name_to_update}' with genre '{genre_to_update}' updated successfully.")
+        try:
+            with transaction() as conn:
+                conn.execute("UPDATE bands SET name = ?, genre = ? WHERE id = ?",
+                             (name_to_update, genre_to_update, band.id))
+                touch("bands")
+        except sqlite3.IntegrityError as e:
+            raise cls._translate(e, new_name) from None
+        finally:
+            cls.identity_map.discard(band.id)
+        return cls.find_by_id(band.id)
 
     @classmethod
     def delete(cls, band_id):
 
         band = cls.find_by_id(band_id)
-        
+
         if not band:
-            print(f"Band with ID {band_id} not found.")
-            return
+            return None
+
+        cls.delete_many([band.id])
+        return band
 
-        CURSOR.execute("DELETE FROM bands WHERE id = ?", (band_id,))
-        CONN.commit()
+    @classmethod
+    def delete_many(cls, band_ids):
+        # Tour dates go with their band through ON DELETE CASCADE, all in the
+        # same transaction. The cascade cannot reach the archive database, so
+        # archived dates are deleted explicitly.
+        from models.tour_date import ARCHIVE_TABLE, TourDate
+
+        band_ids = [int(band_id) for band_id in band_ids]
+        with transaction() as conn:
+            deleted = conn.executemany("DELETE FROM bands WHERE id = ?", [(band_id,) for band_id in band_ids]).rowcount
+            conn.executemany("DELETE FROM archive.tour_dates WHERE band_id = ?", [(band_id,) for band_id in band_ids])
+            touch("bands", "tour_dates", ARCHIVE_TABLE)
+
+        for band_id in band_ids:
+            cls.identity_map.discard(band_id)
+            TourDate.availability.discard_band(band_id)
+        TourDate.identity_map.clear()
+        return deleted
 
-        print(f"Band '{band[1]}' with genre '{band[2]}' has been successfully deleted.")
-        
     @classmethod
     def find_by_id(cls, band_id):
-        return CURSOR.execute("SELECT * FROM bands WHERE id = ?", (band_id,)).fetchone()
+        try:
+            band_id = int(band_id)
+        except (TypeError, ValueError):
+            return None
+        check_external_changes()
+        band = cls.identity_map.get(band_id)
+        if band is not None:
+            return band
+        return query("SELECT id, name, genre FROM bands WHERE id = ?", (band_id,), cls.from_row).fetchone()
 
     @classmethod
     def find_by_name(cls, name):
-        return CURSOR.execute("SELECT * FROM bands WHERE name = ?", (name.strip().lower(),)).fetchone()
+        bands = cached_query("SELECT id, name, genre FROM bands WHERE name = ?", (name.strip().lower(),), ("bands",), cls.from_row)
+        return bands[0] if bands else None
+
+    @staticmethod
+    def _translate(error, name):
+        # Name uniqueness is enforced by the idx_bands_name UNIQUE index.
+        if "bands.name" in str(error):
+            return ValueError(f"Band name '{name}' is already taken.")
+        return error
+
+register_cache(Band.identity_map.clear)
@@ -0,0 +1,148 @@
+import json
+import time
+from collections import namedtuple
+from models.connection import query, transaction
+
+# Read side of change_log, the append-only record of every insert, update
+# and delete on bands and tour_dates that triggers write in the same
+# transaction as the change itself. Downstream copies (replicas, search
+# indexes, exports, other hosts' caches) apply the changes after the
+# sequence number they last saw instead of re-reading the whole schedule.
+# Named consumers keep that position in change_log_checkpoints, and
+# compact() drops entries every consumer has moved past.
+
+Change = namedtuple("Change", "seq table op row_id payload changed_at")
+
+TABLES = ("bands", "tour_dates")
+BATCH_SIZE = 1000
+POLL_INTERVAL = 1.0
+COMPACT_BATCH_SIZE = 10000
+
+class ChangeLogGap(ValueError):
+    # Some of the requested changes were compacted away. The consumer has to
+    # reload from the tables and resume from latest_seq() taken beforehand.
+    def __init__(self, seq, compacted):
+        super().__init__(f"Changes after {seq} up to {compacted} have been compacted; reload and resume from the latest sequence.")
+        self.seq = seq
+        self.compacted = compacted
+
+def change_from_row(row):
+    seq, table, op, row_id, payload, changed_at = row
+    return Change(seq, table, op, row_id, json.loads(payload) if payload else None, changed_at)
+
+def latest_seq():
+    row = query("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return row[0] if row else 0
+
+def compacted_seq():
+    return query("SELECT value FROM change_log_state WHERE name = 'compacted'").fetchone()[0]
+
+def changes_since(seq=0, limit=BATCH_SIZE, tables=None):
+    # Up to limit changes after seq, oldest first. The compaction horizon is
+    # read by the same statement as the rows, so a compaction running
+    # concurrently can never make missing changes look like no changes.
+    where, params = ["seq > ?"], [seq]
+    if tables:
+        where.append(f"table_name IN ({', '.join('?' * len(tables))})")
+        params.extend(tables)
+
+    rows = query(f"""
+        SELECT (SELECT value FROM change_log_state WHERE name = 'compacted'),
+               seq, table_name, op, row_id, payload, changed_at
+        FROM change_log
+        WHERE {' AND '.join(where)}
+        ORDER BY seq
+        LIMIT ?
+    """, (*params, limit)).fetchall()
+
+    compacted = rows[0][0] if rows else compacted_seq()
+    if seq < compacted:
+        raise ChangeLogGap(seq, compacted)
+    return [change_from_row(row[1:]) for row in rows]
+
+def checkpoints():
+    return query("SELECT consumer, seq, updated_at FROM change_log_checkpoints ORDER BY consumer").fetchall()
+
+def forget_consumer(consumer):
+    with transaction() as conn:
+        return conn.execute("DELETE FROM change_log_checkpoints WHERE consumer = ?", (consumer,)).rowcount > 0
+
+def compact(upto=None, batch_size=COMPACT_BATCH_SIZE):
+    # Deletes changes up to upto, by default everything all consumers have
+    # checkpointed past, in batches so writers are never held up for long.
+    # With no checkpoints there is nothing to go by (a consumer that has not
+    # checkpointed yet may still need all of it), so only an explicit upto
+    # deletes anything. The horizon moves first: a consumer still behind it
+    # gets ChangeLogGap, never a silent hole.
+    if upto is None:
+        upto = query("SELECT MIN(seq) FROM change_log_checkpoints").fetchone()[0]
+        if upto is None:
+            return 0
+
+    with transaction() as conn:
+        conn.execute("UPDATE change_log_state SET value = MAX(value, ?) WHERE name = 'compacted'", (upto,))
+
+    deleted = 0
+    while True:
+        with transaction() as conn:
+            count = conn.execute(
+                "DELETE FROM change_log WHERE seq IN (SELECT seq FROM change_log WHERE seq <= ? ORDER BY seq LIMIT ?)",
+                (upto, batch_size),
+            ).rowcount
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+def status():
+    oldest, entries = query("SELECT MIN(seq), COUNT(*) FROM change_log").fetchone()
+    latest = latest_seq()
+    return {
+        "latest": latest,
+        "oldest": oldest,
+        "entries": entries,
+        "compacted": compacted_seq(),
+        "consumers": [
+            {"consumer": consumer, "seq": seq, "lag": latest - seq, "updated_at": updated_at}
+            for consumer, seq, updated_at in checkpoints()
+        ],
+    }
+
+class ChangeTailer:
+    # Follows the change log for one named consumer, starting from its last
+    # checkpoint (or from start, for a consumer seen for the first time).
+    def __init__(self, consumer, tables=None, batch_size=BATCH_SIZE, start=0):
+        self.consumer = consumer
+        self.tables = tuple(tables) if tables else None
+        self.batch_size = batch_size
+        row = query("SELECT seq FROM change_log_checkpoints WHERE consumer = ?", (consumer,)).fetchone()
+        self.position = row[0] if row else start
+
+    def poll(self):
+        return changes_since(self.position, self.batch_size, self.tables)
+
+    def checkpoint(self, seq):
+        with transaction() as conn:
+            conn.execute("""
+                INSERT INTO change_log_checkpoints (consumer, seq) VALUES (?, ?)
+                ON CONFLICT (consumer) DO UPDATE SET seq = excluded.seq, updated_at = excluded.updated_at
+            """, (self.consumer, seq))
+        self.position = seq
+
+    def batches(self, follow=False, interval=POLL_INTERVAL):
+        # Each batch is checkpointed when the next one is requested, that is
+        # once the caller has finished with it, so a consumer that crashes
+        # sees at most the batch it was working on again. With follow, waits
+        # for new changes instead of stopping at the end of the log.
+        while True:
+            changes = self.poll()
+            if changes:
+                yield changes
+                self.checkpoint(changes[-1].seq)
+            elif follow:
+                time.sleep(interval)
+            else:
+                return
+
+    def changes(self, follow=False, interval=POLL_INTERVAL):
+        for batch in self.batches(follow, interval):
+            yield from batch
@@ -0,0 +1,243 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date
+from models.instrumentation import connection_factory
+from models.query_cache import QUERY_CACHE
+from models.schema import ARCHIVE_MIGRATIONS, migrate
+
+DB_PATH = os.environ.get("TOUR_SCHEDULE_DB", "tour_schedule.db")
+ARCHIVE_PATH = os.environ.get("TOUR_SCHEDULE_ARCHIVE")
+# NORMAL only syncs the WAL at checkpoints; FULL syncs every commit, which
+# survives power loss and is where the group-commit WriteQueue pays off.
+SYNCHRONOUS = os.environ.get("TOUR_SCHEDULE_SYNCHRONOUS", "NORMAL").upper()
+
+BUSY_TIMEOUT = 30
+CACHE_SIZE_KIB = 64 * 1024
+MMAP_SIZE = 256 * 1024 * 1024
+FETCH_SIZE = 500
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    f"PRAGMA synchronous = {SYNCHRONOUS}",
+    f"PRAGMA cache_size = -{CACHE_SIZE_KIB}",
+    f"PRAGMA mmap_size = {MMAP_SIZE}",
+    "PRAGMA temp_store = MEMORY",
+)
+
+ARCHIVE_PRAGMAS = (
+    "PRAGMA archive.journal_mode = WAL",
+    f"PRAGMA archive.synchronous = {SYNCHRONOUS}",
+)
+
+# Tour days are stored as integer day ordinals (date.toordinal()). Dates bound
+# as parameters are adapted on the way in, and columns selected as
+# 'day AS "day [day]"' come back as dates.
+sqlite3.register_adapter(date, date.toordinal)
+sqlite3.register_converter("day", lambda value: date.fromordinal(int(value)))
+
+# Set by use_replica() to serve every read from an in-memory copy of the
+# schedule (see models/replica.py); writes are refused meanwhile.
+REPLICA = None
+
+_local = threading.local()
+_migrated = set()
+_migrate_lock = threading.Lock()
+_caches = []
+
+def configure(path):
+    global DB_PATH
+    close_connection()
+    DB_PATH = path
+
+def archive_path(path):
+    # Past tour dates live in a second file next to the schedule, e.g.
+    # tour_schedule_archive.db, unless TOUR_SCHEDULE_ARCHIVE names one.
+    if ARCHIVE_PATH:
+        return ARCHIVE_PATH
+    return companion_path(path, "archive")
+
+def companion_path(path, suffix):
+    if path == ":memory:":
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_{suffix}{ext or '.db'}"
+
+def open_connection(path):
+    # Autocommit mode: single statements commit on their own and anything
+    # larger goes through transaction(), so nothing is left open implicitly.
+    conn = sqlite3.connect(
+        path, timeout=BUSY_TIMEOUT, isolation_level=None,
+        detect_types=sqlite3.PARSE_COLNAMES, factory=connection_factory(),
+    )
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    conn.execute("ATTACH DATABASE ? AS archive", (archive_path(path),))
+    for pragma in ARCHIVE_PRAGMAS:
+        conn.execute(pragma)
+
+    # migrate() takes the database's write lock, which also keeps other
+    # processes out; the in-process set only saves re-checking the version.
+    with _migrate_lock:
+        if path not in _migrated:
+            migrate(conn)
+            migrate(conn, ARCHIVE_MIGRATIONS, "archive")
+            _migrated.add(path)
+
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+def use_replica(replica):
+    global REPLICA
+    REPLICA = replica
+    clear_caches()
+
+def get_connection():
+    conn = getattr(_local, "conn", None)
+    replica = REPLICA
+    path = replica.uri if replica is not None else DB_PATH
+
+    if conn is None or _local.path != path:
+        if replica is not None:
+            # The old connection is dropped, not closed: a stream still
+            # reading the previous copy keeps it alive until it finishes.
+            path, conn = replica.connect()
+        else:
+            if conn is not None:
+                conn.close()
+            conn = open_connection(path)
+        _local.conn = conn
+        _local.path = path
+        _local.depth = 0
+        _local.touched = set()
+        _local.writes = 0
+        # Whatever was cached before this connection existed may predate
+        # commits it will never report, so a new connection counts as a change.
+        _local.data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        clear_caches()
+
+    return conn
+
+def close_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+@contextmanager
+def transaction():
+    # Nested calls become savepoints, so a model method that opens its own
+    # transaction can still be composed into a larger one.
+    if REPLICA is not None:
+        raise ValueError("The schedule is open read-only.")
+    conn = get_connection()
+    depth = _local.depth
+    writes = _local.writes
+    savepoint = f"sp_{depth}"
+
+    conn.execute("BEGIN IMMEDIATE" if depth == 0 else f"SAVEPOINT {savepoint}")
+    _local.depth = depth + 1
+    try:
+        yield conn
+    except BaseException:
+        _local.depth = depth
+        if depth == 0:
+            conn.execute("ROLLBACK")
+        else:
+            conn.execute(f"ROLLBACK TO {savepoint}")
+            conn.execute(f"RELEASE {savepoint}")
+        if _local.writes != writes:
+            # Model writes update caches as they go; undoing them in place is
+            # not worth it for something this rare.
+            clear_caches()
+        raise
+    else:
+        _local.depth = depth
+        conn.execute("COMMIT" if depth == 0 else f"RELEASE {savepoint}")
+    finally:
+        if depth == 0 and _local.touched:
+            # Cached reads taken while the transaction was open may hold
+            # uncommitted or rolled back rows.
+            QUERY_CACHE.invalidate(*_local.touched)
+            _local.touched = set()
+
+def touch(*tables):
+    # Called by every model write path with the tables it changes.
+    QUERY_CACHE.invalidate(*tables)
+    _local.writes += 1
+    if _local.depth:
+        _local.touched.update(tables)
+
+def register_cache(clear):
+    # In-process copies of database state (identity maps, the availability
+    # index) register here to be dropped whenever they may be stale.
+    _caches.append(clear)
+
+def clear_caches():
+    QUERY_CACHE.clear()
+    for clear in _caches:
+        clear()
+
+def check_external_changes():
+    # PRAGMA data_version changes when any other connection, in this process
+    # or another, commits; this connection's own commits never change it.
+    # Writes from other threads are also applied by their own model calls,
+    # but there is no telling them apart from another process, so every
+    # change drops the caches.
+    conn = get_connection()
+    version = conn.execute("PRAGMA data_version").fetchone()[0]
+    if version != _local.data_version:
+        _local.data_version = version
+        clear_caches()
+
+def query(sql, params=(), row_factory=None):
+    cursor = get_connection().cursor()
+    if row_factory is not None:
+        cursor.row_factory = lambda _, row: row_factory(row)
+    return cursor.execute(sql, params)
+
+def cached_query(sql, params=(), tables=(), row_factory=None):
+    check_external_changes()
+    key = (sql, tuple(params))
+    rows = QUERY_CACHE.get(key)
+    if rows is None:
+        snapshot = QUERY_CACHE.snapshot(tables)
+        rows = query(sql, params).fetchall()
+        QUERY_CACHE.put(key, tables, rows, snapshot)
+    return [row_factory(row) for row in rows] if row_factory else rows
+
+def cached_stream(sql, params=(), tables=(), row_factory=None, size=FETCH_SIZE):
+    # Streams like stream() on a miss and keeps the rows for next time, unless
+    # the result outgrows the cache's row limit or the caller stops early.
+    check_external_changes()
+    key = (sql, tuple(params))
+    rows = QUERY_CACHE.get(key)
+    if rows is not None:
+        yield from map(row_factory, rows) if row_factory else rows
+        return
+
+    snapshot = QUERY_CACHE.snapshot(tables)
+    collected = [] if QUERY_CACHE.enabled else None
+    for row in stream(sql, params, size=size):
+        if collected is not None:
+            collected.append(row)
+            if len(collected) > QUERY_CACHE.max_rows:
+                collected = None
+        yield row_factory(row) if row_factory else row
+
+    if collected is not None:
+        QUERY_CACHE.put(key, tables, collected, snapshot)
+
+def stream(sql, params=(), row_factory=None, size=FETCH_SIZE):
+    # A dedicated cursor keeps the stream valid while other queries run on
+    # the same connection between rows.
+    cursor = query(sql, params, row_factory)
+    try:
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
@@ -0,0 +1,35 @@
+import threading
+from collections import OrderedDict
+
+class IdentityMap:
+    # Maps primary keys to the single loaded instance for that row, evicting
+    # the least recently used entries once maxsize is reached.
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._objects = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._objects)
+
+    def get(self, key):
+        with self._lock:
+            obj = self._objects.get(key)
+            if obj is not None:
+                self._objects.move_to_end(key)
+            return obj
+
+    def add(self, key, obj):
+        with self._lock:
+            self._objects[key] = obj
+            self._objects.move_to_end(key)
+            if len(self._objects) > self.maxsize:
+                self._objects.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._objects.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
@@ -0,0 +1,181 @@
+import atexit
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Opt-in query instrumentation. With TOUR_SCHEDULE_QUERY_LOG set, every
+# connection is opened with InstrumentedConnection, which records per-statement
+# counts, time and rows, logs statements slower than TOUR_SCHEDULE_SLOW_QUERY_MS
+# along with their query plan, and prints a summary when the process exits.
+
+ENABLED = bool(os.environ.get("TOUR_SCHEDULE_QUERY_LOG"))
+SLOW_QUERY_MS = float(os.environ.get("TOUR_SCHEDULE_SLOW_QUERY_MS", 100))
+
+logger = logging.getLogger("tour_schedule.queries")
+
+class StatementStats:
+    __slots__ = ("sql", "count", "total", "max", "rows")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+
+class QueryStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._statements = {}
+        self._normalized = {}
+
+    def entry(self, sql):
+        with self._lock:
+            key = self._normalized.get(sql)
+            if key is None:
+                key = self._normalized[sql] = " ".join(sql.split())
+            stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = StatementStats(key)
+            return stats
+
+    def record(self, stats, elapsed, cumulative, rows=0, executed=False):
+        with self._lock:
+            if executed:
+                stats.count += 1
+            stats.total += elapsed
+            stats.rows += rows
+            if cumulative > stats.max:
+                stats.max = cumulative
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+
+    def summary(self, limit=20):
+        with self._lock:
+            statements = sorted(self._statements.values(), key=lambda s: s.total, reverse=True)
+
+        lines = [f"{'count':>8} {'total ms':>10} {'max ms':>9} {'rows':>9}  statement"]
+        for stats in statements[:limit]:
+            sql = stats.sql if len(stats.sql) <= 100 else stats.sql[:97] + "..."
+            lines.append(f"{stats.count:>8} {stats.total * 1000:>10.1f} {stats.max * 1000:>9.2f} {stats.rows:>9}  {sql}")
+        return "\n".join(lines)
+
+STATS = QueryStats()
+
+class InstrumentedCursor(sqlite3.Cursor):
+    # Time spent stepping through rows counts towards the statement as well,
+    # since for streamed queries most of the work happens in fetch calls.
+    _stats = None
+    _elapsed = 0.0
+    _params = ()
+    _logged = False
+
+    def _begin(self, sql, params):
+        self._stats = STATS.entry(sql)
+        self._elapsed = 0.0
+        self._params = params
+        self._logged = False
+
+    def _account(self, elapsed, rows=0, executed=False):
+        if self._stats is None:
+            return
+        self._elapsed += elapsed
+        STATS.record(self._stats, elapsed, self._elapsed, rows, executed)
+        if not self._logged and self._elapsed * 1000 >= SLOW_QUERY_MS:
+            self._logged = True
+            log_slow_query(self.connection, self._stats.sql, self._params, self._elapsed)
+
+    def execute(self, sql, params=()):
+        self._begin(sql, params)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._account(time.perf_counter() - started, executed=True)
+
+    def executemany(self, sql, seq_of_params):
+        self._begin(sql, None)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            self._account(time.perf_counter() - started, rows=max(self.rowcount, 0), executed=True)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._account(time.perf_counter() - started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._account(time.perf_counter() - started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._account(time.perf_counter() - started, len(rows))
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._account(time.perf_counter() - started)
+            raise
+        self._account(time.perf_counter() - started, 1)
+        return row
+
+class InstrumentedConnection(sqlite3.Connection):
+    # Connection.execute builds its cursor internally without going through
+    # cursor(), so the shortcuts are routed explicitly.
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+def query_plan(conn, sql, params):
+    if params is None or not sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")):
+        return []
+    try:
+        cursor = sqlite3.Cursor(conn)
+        return [row[-1] for row in cursor.execute("EXPLAIN QUERY PLAN " + sql, params)]
+    except sqlite3.Error:
+        return []
+
+def log_slow_query(conn, sql, params, elapsed):
+    plan = query_plan(conn, sql, params)
+    logger.warning(
+        "slow query (%.1f ms): %s%s", elapsed * 1000, sql,
+        "".join(f"\n    plan: {step}" for step in plan),
+    )
+
+def connection_factory():
+    return InstrumentedConnection if ENABLED else sqlite3.Connection
+
+def summary(limit=20):
+    if not ENABLED:
+        return "Query instrumentation is off. Set TOUR_SCHEDULE_QUERY_LOG=1 to enable it."
+    return STATS.summary(limit)
+
+def _report_at_exit():
+    print("\nQuery summary:\n" + summary(), file=sys.stderr)
+
+if ENABLED:
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    atexit.register(_report_at_exit)
@@ -0,0 +1,108 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Result cache for read-mostly model queries, keyed by SQL and parameters.
+# Entries remember which tables they read, and writes invalidate by table.
+# TOUR_SCHEDULE_QUERY_CACHE sets the number of entries; 0 turns it off.
+
+CACHE_SIZE = int(os.environ.get("TOUR_SCHEDULE_QUERY_CACHE", 256))
+MAX_ROWS = 10000
+
+class QueryCache:
+    def __init__(self, maxsize=CACHE_SIZE, max_rows=MAX_ROWS):
+        self.maxsize = maxsize
+        self.max_rows = max_rows
+        self._entries = OrderedDict()
+        self._by_table = {}
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def snapshot(self, tables):
+        # Taken before running the query. put() refuses the rows if any of
+        # the tables was written in between, so a slow read cannot store
+        # results that a concurrent write already made stale.
+        with self._lock:
+            return self._snapshot(tables)
+
+    def _snapshot(self, tables):
+        return (self._epoch, *(self._generations.get(table, 0) for table in tables))
+
+    def put(self, key, tables, rows, snapshot):
+        if not self.enabled or len(rows) > self.max_rows:
+            return
+        with self._lock:
+            if snapshot != self._snapshot(tables):
+                return
+            self._drop(key)
+            self._entries[key] = (tables, rows)
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tables):
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+                for key in self._by_table.pop(table, ()):
+                    if key in self._entries:
+                        self._drop(key)
+                        self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._by_table.clear()
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            for table in entry[0]:
+                keys = self._by_table.get(table)
+                if keys is not None:
+                    keys.discard(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def summary(self):
+        if not self.enabled:
+            return "Query cache is off. Set TOUR_SCHEDULE_QUERY_CACHE to a size to enable it."
+        return "Query cache: " + ", ".join(f"{name} {value}" for name, value in self.stats().items())
+
+QUERY_CACHE = QueryCache()
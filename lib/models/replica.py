@@ -0,0 +1,265 @@
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from models import connection
+from models.connection import companion_path, open_connection, use_replica
+from models.instrumentation import connection_factory
+from models.schema import SCHEMA_VERSION
+
+# Read-only serving from memory. A Replica copies the schedule and its
+# archive into in-memory SQLite databases (the memdb VFS, which every thread
+# can open by name), and once installed with use_replica() get_connection()
+# hands out connections to that copy instead of the file, so lookups never
+# wait on disk and transaction() refuses writes. A background thread polls
+# the file's PRAGMA data_version and, when anything has committed since the
+# last copy, makes a fresh one and swaps it in; each thread moves over on
+# its next query.
+#
+# save_image() writes a compact copy of the schedule to disk. A replica
+# started from one serves it at once and only copies the live file in the
+# background if the change log has moved on since the image was saved.
+#
+# memdb databases are capped at 1 GiB by default.
+
+READ_ONLY = bool(os.environ.get("TOUR_SCHEDULE_READ_ONLY"))
+IMAGE_PATH = os.environ.get("TOUR_SCHEDULE_REPLICA_IMAGE")
+REFRESH_INTERVAL = float(os.environ.get("TOUR_SCHEDULE_REPLICA_REFRESH", 1.0))
+
+READER_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    f"PRAGMA mmap_size = {connection.MMAP_SIZE}",
+    "PRAGMA temp_store = MEMORY",
+)
+
+logger = logging.getLogger("tour_schedule.replica")
+
+def memdb_uri(name):
+    return f"file:/{name}?vfs=memdb"
+
+def change_position(conn):
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return row[0] if row else 0
+
+def copy_live(source, main, archive):
+    # VACUUM INTO rather than the backup API: a backup keeps the file's WAL
+    # header, and a copy with one cannot be opened in memory. The schedule
+    # is copied before the archive, and archiving writes a row to the archive
+    # before deleting it from the schedule, so a tour date archived in
+    # between appears twice (history queries skip the duplicate) but is
+    # never missing.
+    source.execute("VACUUM main INTO ?", (main,))
+    source.execute("VACUUM archive INTO ?", (archive,))
+
+def save_image(image, path=None):
+    # Written under temporary names and moved into place, archive first, so
+    # a replica never warm-starts from a half-written image.
+    archive = companion_path(image, "archive")
+    temporary = [f"{image}.tmp", f"{archive}.tmp"]
+    for name in temporary:
+        if os.path.exists(name):
+            os.remove(name)
+
+    source = open_connection(path or connection.DB_PATH)
+    try:
+        copy_live(source, *temporary)
+        seq = change_position(source)
+    finally:
+        source.close()
+    os.replace(temporary[1], archive)
+    os.replace(temporary[0], image)
+    return {"image": image, "change_seq": seq, "bytes": os.path.getsize(image) + os.path.getsize(archive)}
+
+class Replica:
+    def __init__(self, path=None, refresh_interval=REFRESH_INTERVAL):
+        self.path = path or connection.DB_PATH
+        self.refresh_interval = refresh_interval
+        self.uri = None
+        self.generation = 0
+        self.loads = 0
+        self.loaded_from = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self._archive_uri = None
+        self._keepers = ()
+        self._image_seq = None
+        self._copies = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._error = None
+        self._thread = None
+
+    def start(self, image=None):
+        # Returns once there is a copy to serve: straight away when the image
+        # can be used, otherwise after the first copy of the live file.
+        if image and not self._load_image(image):
+            image = None
+        if image:
+            # From here on, failing to copy the live file is logged and retried.
+            self._ready.set()
+        self._thread = threading.Thread(target=self._run, name="tour-schedule-replica", daemon=True)
+        self._thread.start()
+        if not image:
+            self._ready.wait()
+            if self._error is not None:
+                self.close()
+                raise self._error
+        return self
+
+    def connect(self):
+        # Under the lock, so the copy cannot be swapped out and freed between
+        # reading its name and opening it.
+        with self._lock:
+            uri = self.uri
+            conn = sqlite3.connect(
+                uri, uri=True, isolation_level=None,
+                detect_types=sqlite3.PARSE_COLNAMES, factory=connection_factory(),
+            )
+            conn.execute("ATTACH DATABASE ? AS archive", (self._archive_uri,))
+        for pragma in READER_PRAGMAS:
+            conn.execute(pragma)
+        return uri, conn
+
+    def refresh(self):
+        # Copies the live file now, whether or not it has changed.
+        source = open_connection(self.path)
+        try:
+            self._load_live(source)
+        finally:
+            source.close()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if connection.REPLICA is self:
+            use_replica(None)
+        with self._lock:
+            keepers, self._keepers = self._keepers, ()
+        for keeper in keepers:
+            keeper.close()
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "generation": self.generation,
+            "loads": self.loads,
+            "loaded_from": self.loaded_from,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self):
+        source = None
+        version = None
+        try:
+            while True:
+                try:
+                    if source is None:
+                        source = open_connection(self.path)
+                    # Read before copying: a commit that lands during the copy
+                    # then shows up as a change on the next poll.
+                    current = source.execute("PRAGMA data_version").fetchone()[0]
+                    if version is None and self._image_seq == change_position(source):
+                        version = current
+                    if current != version:
+                        self._load_live(source)
+                        version = current
+                except Exception as e:
+                    if not self._ready.is_set():
+                        self._error = e
+                        return
+                    logger.exception("Could not refresh the copy of %s; retrying.", self.path)
+                self._ready.set()
+                if self._stop.wait(self.refresh_interval):
+                    return
+        finally:
+            self._ready.set()
+            if source is not None:
+                source.close()
+
+    def _load_live(self, source):
+        started = time.perf_counter()
+        main, archive, keepers = self._new_copy()
+        try:
+            copy_live(source, main, archive)
+        except BaseException:
+            for keeper in keepers:
+                keeper.close()
+            raise
+        self._swap(main, archive, keepers, self.path, started)
+
+    def _load_image(self, image):
+        # Images are in rollback-journal mode, so unlike the live file they
+        # can go through the backup API, a straight page copy.
+        if not os.path.exists(image):
+            return False
+        started = time.perf_counter()
+        sources, keepers = [], []
+        try:
+            for name in (image, companion_path(image, "archive")):
+                sources.append(sqlite3.connect(Path(name).resolve().as_uri() + "?mode=ro", uri=True))
+            version = sources[0].execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                logger.warning("Ignoring image %s: schema version %s, expected %s.", image, version, SCHEMA_VERSION)
+                return False
+            main, archive, keepers = self._new_copy()
+            for source, keeper in zip(sources, keepers):
+                source.backup(keeper)
+            self._image_seq = change_position(sources[0])
+        except sqlite3.Error:
+            logger.exception("Ignoring unreadable image %s.", image)
+            for keeper in keepers:
+                keeper.close()
+            return False
+        finally:
+            for source in sources:
+                source.close()
+        self._swap(main, archive, keepers, image, started)
+        return True
+
+    def _new_copy(self):
+        # A memdb database lives as long as a connection has it open, so each
+        # copy is held open by its own pair of connections until replaced.
+        name = f"tour_schedule_replica_{id(self)}_{next(self._copies)}"
+        main, archive = memdb_uri(name), memdb_uri(f"{name}_archive")
+        keepers = [sqlite3.connect(uri, uri=True, isolation_level=None, check_same_thread=False)
+                   for uri in (main, archive)]
+        return main, archive, keepers
+
+    def _swap(self, main, archive, keepers, source, started):
+        with self._lock:
+            old, self._keepers = self._keepers, tuple(keepers)
+            self.uri, self._archive_uri = main, archive
+            self.generation += 1
+            self.loads += 1
+        self.loaded_from = source
+        self.loaded_at = datetime.now().isoformat(timespec="seconds")
+        self.load_seconds = round(time.perf_counter() - started, 3)
+        # Threads still reading the old copy keep it open until they move on.
+        for keeper in old:
+            keeper.close()
+        if connection.REPLICA is self:
+            # Cached results from the old copy must not outlive it.
+            connection.clear_caches()
+
+def serve_read_only(path=None, image=None, refresh_interval=REFRESH_INTERVAL):
+    replica = Replica(path, refresh_interval).start(image)
+    use_replica(replica)
+    return replica
+
+def start_from_env():
+    if READ_ONLY:
+        return serve_read_only(image=IMAGE_PATH)
+    return None
@@ -0,0 +1,383 @@
+import logging
+import sqlite3
+
+logger = logging.getLogger("tour_schedule.schema")
+
+# Kept apart from search_index_script because rebuilding tour_dates drops
+# its triggers, so later migrations have to recreate them.
+TOUR_DATES_SEARCH_TRIGGERS = '''
+    CREATE TRIGGER tour_dates_search_insert AFTER INSERT ON tour_dates BEGIN
+        INSERT INTO search_terms (kind, term) VALUES ('location', new.location)
+            ON CONFLICT (kind, term) DO UPDATE SET uses = uses + 1;
+        INSERT INTO search_terms (kind, term) VALUES ('venue', new.venue)
+            ON CONFLICT (kind, term) DO UPDATE SET uses = uses + 1;
+    END;
+    CREATE TRIGGER tour_dates_search_delete AFTER DELETE ON tour_dates BEGIN
+        UPDATE search_terms SET uses = uses - 1
+            WHERE (kind = 'location' AND term = old.location) OR (kind = 'venue' AND term = old.venue);
+        DELETE FROM search_terms
+            WHERE uses <= 0 AND ((kind = 'location' AND term = old.location) OR (kind = 'venue' AND term = old.venue));
+    END;
+    CREATE TRIGGER tour_dates_search_update AFTER UPDATE OF location, venue ON tour_dates BEGIN
+        INSERT INTO search_terms (kind, term) VALUES ('location', new.location)
+            ON CONFLICT (kind, term) DO UPDATE SET uses = uses + 1;
+        INSERT INTO search_terms (kind, term) VALUES ('venue', new.venue)
+            ON CONFLICT (kind, term) DO UPDATE SET uses = uses + 1;
+        UPDATE search_terms SET uses = uses - 1
+            WHERE (kind = 'location' AND term = old.location) OR (kind = 'venue' AND term = old.venue);
+        DELETE FROM search_terms
+            WHERE uses <= 0 AND ((kind = 'location' AND term = old.location) OR (kind = 'venue' AND term = old.venue));
+    END;
+'''
+
+# Per-key summaries of tour_dates: how many dates each band, venue and
+# location has and the first and last of them. The same key column name is
+# used in tour_dates and in the summary table.
+STATS_TABLES = (("band_stats", "band_id"), ("venue_stats", "venue"), ("location_stats", "location"))
+
+def stats_add(table, column, row):
+    return f'''
+        INSERT INTO {table} ({column}, tours, first_day, last_day)
+            SELECT {row}.{column}, 1, {row}.day, {row}.day WHERE {row}.{column} IS NOT NULL
+            ON CONFLICT ({column}) DO UPDATE SET
+                tours = tours + 1,
+                first_day = MIN(first_day, excluded.first_day),
+                last_day = MAX(last_day, excluded.last_day);'''
+
+def stats_remove(table, column, row):
+    # Triggers run after the change, so the recount only sees the rows that
+    # remain. It is an index seek and only needed when the removed day was
+    # the first or the last one. A key losing its only date is dropped first.
+    return f'''
+        DELETE FROM {table} WHERE {column} = {row}.{column} AND tours <= 1;
+        UPDATE {table} SET
+            tours = tours - 1,
+            first_day = CASE WHEN {row}.day = first_day
+                THEN (SELECT MIN(day) FROM tour_dates WHERE {column} = {row}.{column}) ELSE first_day END,
+            last_day = CASE WHEN {row}.day = last_day
+                THEN (SELECT MAX(day) FROM tour_dates WHERE {column} = {row}.{column}) ELSE last_day END
+            WHERE {column} = {row}.{column};'''
+
+# Like the search triggers, these must be recreated by any migration that
+# rebuilds tour_dates.
+TOUR_DATES_STATS_TRIGGERS = f'''
+    CREATE TRIGGER tour_dates_stats_insert AFTER INSERT ON tour_dates BEGIN
+        {"".join(stats_add(table, column, "new") for table, column in STATS_TABLES)}
+    END;
+    CREATE TRIGGER tour_dates_stats_delete AFTER DELETE ON tour_dates BEGIN
+        {"".join(stats_remove(table, column, "old") for table, column in STATS_TABLES)}
+    END;
+    CREATE TRIGGER tour_dates_stats_update AFTER UPDATE OF band_id, location, venue, day ON tour_dates BEGIN
+        {"".join(stats_remove(table, column, "old") for table, column in STATS_TABLES)}
+        {"".join(stats_add(table, column, "new") for table, column in STATS_TABLES)}
+    END;
+'''
+
+# Every insert, update and delete on bands and tour_dates is appended to
+# change_log with the row's new values as JSON (none for deletes). Like the
+# other tour_dates triggers, these must survive any rebuild of the table.
+BAND_PAYLOAD = "json_object('id', {row}.id, 'name', {row}.name, 'genre', {row}.genre)"
+# julianday() of day ordinal 1 (0001-01-01) is 1721425.5.
+TOUR_DATE_PAYLOAD = (
+    "json_object('id', {row}.id, 'band_id', {row}.band_id, 'location', {row}.location, "
+    "'venue', {row}.venue, 'day', {row}.day, 'date', DATE({row}.day + 1721424.5))"
+)
+
+def change_triggers(table, payload, update_when=None):
+    when = f" WHEN {update_when}" if update_when else ""
+    return f'''
+    CREATE TRIGGER {table}_changes_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO change_log (table_name, op, row_id, payload)
+            VALUES ('{table}', 'insert', new.id, {payload.format(row="new")});
+    END;
+    CREATE TRIGGER {table}_changes_update AFTER UPDATE ON {table}{when} BEGIN
+        INSERT INTO change_log (table_name, op, row_id, payload)
+            VALUES ('{table}', 'update', new.id, {payload.format(row="new")});
+    END;
+    CREATE TRIGGER {table}_changes_delete AFTER DELETE ON {table} BEGIN
+        INSERT INTO change_log (table_name, op, row_id) VALUES ('{table}', 'delete', old.id);
+    END;
+'''
+
+# TourDate.update_many parks the rows it moves on a negative day before
+# giving them their final values; that step is not a change to report.
+TOUR_DATES_CHANGE_TRIGGERS = change_triggers("tour_dates", TOUR_DATE_PAYLOAD, update_when="new.day > 0")
+
+# Recomputes every summary from tour_dates; the triggers keep them current
+# after that.
+STATS_REBUILD = "".join(f'''
+    DELETE FROM {table};
+    INSERT INTO {table} ({column}, tours, first_day, last_day)
+        SELECT {column}, COUNT(*), MIN(day), MAX(day) FROM tour_dates WHERE {column} IS NOT NULL GROUP BY {column};
+''' for table, column in STATS_TABLES)
+
+# Each entry upgrades the schema by one version; PRAGMA user_version records
+# how many have been applied to the database file.
+MIGRATIONS = [
+    '''
+    CREATE TABLE IF NOT EXISTS bands (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        genre TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS tour_dates (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        band_id INTEGER,
+        location TEXT NOT NULL,
+        date TEXT NOT NULL,
+        venue TEXT NOT NULL,
+        FOREIGN KEY(band_id) REFERENCES bands(id)
+    );
+    ''',
+    '''
+    UPDATE bands SET name = LOWER(TRIM(name)), genre = LOWER(TRIM(genre));
+    UPDATE tour_dates SET location = LOWER(TRIM(location)), venue = LOWER(TRIM(venue));
+
+    ALTER TABLE tour_dates ADD COLUMN day TEXT;
+    UPDATE tour_dates SET day = DATE(date);
+
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_bands_name ON bands(name);
+    CREATE INDEX IF NOT EXISTS idx_tour_dates_band_day ON tour_dates(band_id, day);
+    CREATE INDEX IF NOT EXISTS idx_tour_dates_location_day ON tour_dates(location, day);
+    CREATE INDEX IF NOT EXISTS idx_tour_dates_venue_day ON tour_dates(venue, day);
+    CREATE INDEX IF NOT EXISTS idx_tour_dates_day ON tour_dates(day);
+    ''',
+    lambda conn: unique_venue_day_script(conn),
+    # SQLite cannot add ON DELETE CASCADE to an existing foreign key, so
+    # tour_dates is rebuilt. Orphaned rows are copied as-is and left for
+    # TourDate.delete_orphans to sweep.
+    '''
+    CREATE TABLE tour_dates_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        band_id INTEGER REFERENCES bands(id) ON DELETE CASCADE,
+        location TEXT NOT NULL,
+        date TEXT NOT NULL,
+        venue TEXT NOT NULL,
+        day TEXT
+    );
+    INSERT INTO tour_dates_new (id, band_id, location, date, venue, day)
+        SELECT id, band_id, location, date, venue, day FROM tour_dates;
+    DROP TABLE tour_dates;
+    ALTER TABLE tour_dates_new RENAME TO tour_dates;
+
+    CREATE INDEX idx_tour_dates_band_day ON tour_dates(band_id, day);
+    CREATE INDEX idx_tour_dates_location_day ON tour_dates(location, day);
+    CREATE UNIQUE INDEX idx_tour_dates_venue_day ON tour_dates(venue, day);
+    CREATE INDEX idx_tour_dates_day ON tour_dates(day);
+    ''',
+    lambda conn: search_index_script(fts5_tokenizer(conn)),
+    # Dates were stored twice, as a datetime string in date and as
+    # YYYY-MM-DD in day. Both become a single integer day ordinal
+    # (date.toordinal()), which is smaller and compares as a number.
+    # julianday() of 0001-01-01 is 1721425.5, ordinal 1.
+    f'''
+    CREATE TABLE tour_dates_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        band_id INTEGER REFERENCES bands(id) ON DELETE CASCADE,
+        location TEXT NOT NULL,
+        venue TEXT NOT NULL,
+        day INTEGER NOT NULL
+    );
+    INSERT INTO tour_dates_new (id, band_id, location, venue, day)
+        SELECT id, band_id, location, venue, CAST(julianday(COALESCE(day, DATE(date))) - 1721424.5 AS INTEGER)
+        FROM tour_dates;
+    DROP TABLE tour_dates;
+    ALTER TABLE tour_dates_new RENAME TO tour_dates;
+
+    CREATE INDEX idx_tour_dates_band_day ON tour_dates(band_id, day);
+    CREATE INDEX idx_tour_dates_location_day ON tour_dates(location, day);
+    CREATE UNIQUE INDEX idx_tour_dates_venue_day ON tour_dates(venue, day);
+    CREATE INDEX idx_tour_dates_day ON tour_dates(day);
+    {TOUR_DATES_SEARCH_TRIGGERS}
+    ''',
+    f'''
+    CREATE TABLE band_stats (
+        band_id INTEGER PRIMARY KEY,
+        tours INTEGER NOT NULL,
+        first_day INTEGER NOT NULL,
+        last_day INTEGER NOT NULL
+    );
+    CREATE TABLE venue_stats (
+        venue TEXT PRIMARY KEY,
+        tours INTEGER NOT NULL,
+        first_day INTEGER NOT NULL,
+        last_day INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    CREATE TABLE location_stats (
+        location TEXT PRIMARY KEY,
+        tours INTEGER NOT NULL,
+        first_day INTEGER NOT NULL,
+        last_day INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    {TOUR_DATES_STATS_TRIGGERS}
+    {STATS_REBUILD}
+    ''',
+    # AUTOINCREMENT keeps sequence numbers increasing even after the oldest
+    # entries are compacted away. Writers are serialised, so sequence order
+    # is also commit order.
+    f'''
+    CREATE TABLE change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        op TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        payload TEXT,
+        changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+    );
+    CREATE TABLE change_log_checkpoints (
+        consumer TEXT PRIMARY KEY,
+        seq INTEGER NOT NULL,
+        updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+    ) WITHOUT ROWID;
+    CREATE TABLE change_log_state (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    INSERT INTO change_log_state (name, value) VALUES ('compacted', 0);
+    {change_triggers("bands", BAND_PAYLOAD)}
+    {TOUR_DATES_CHANGE_TRIGGERS}
+    ''',
+    f'''
+    DROP TRIGGER tour_dates_changes_insert;
+    DROP TRIGGER tour_dates_changes_update;
+    DROP TRIGGER tour_dates_changes_delete;
+    {TOUR_DATES_CHANGE_TRIGGERS}
+    ''',
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+# The archive database, attached to every connection as "archive", holds
+# tour dates moved out of tour_dates once they are past. Rows keep their
+# ids; there is no foreign key across databases, so Band.delete_many
+# removes a band's archived dates itself.
+ARCHIVE_MIGRATIONS = [
+    '''
+    CREATE TABLE archive.tour_dates (
+        id INTEGER PRIMARY KEY,
+        band_id INTEGER,
+        location TEXT NOT NULL,
+        venue TEXT NOT NULL,
+        day INTEGER NOT NULL
+    );
+    CREATE INDEX archive.idx_tour_dates_band_day ON tour_dates(band_id, day);
+    CREATE INDEX archive.idx_tour_dates_location_day ON tour_dates(location, day);
+    CREATE INDEX archive.idx_tour_dates_venue_day ON tour_dates(venue, day);
+    CREATE INDEX archive.idx_tour_dates_day ON tour_dates(day);
+    ''',
+]
+
+def unique_venue_day_script(conn):
+    # Before venue and day were unique, updates could double-book a venue.
+    # The first booking of each venue and day stays; the rest move to
+    # double_bookings, so the index can be built and nothing is lost.
+    clashes = conn.execute("""
+        SELECT venue, day, GROUP_CONCAT(id, ', ') FROM tour_dates
+        WHERE day IS NOT NULL
+        GROUP BY venue, day HAVING COUNT(*) > 1
+    """).fetchall()
+    for venue, day, ids in clashes:
+        logger.warning("Venue '%s' is double-booked on %s (tour dates %s); keeping the first, "
+                       "the others move to double_bookings.", venue, day, ids)
+    return """
+    CREATE TABLE double_bookings AS SELECT * FROM tour_dates WHERE 0;
+    INSERT INTO double_bookings SELECT * FROM tour_dates
+        WHERE day IS NOT NULL AND id NOT IN (SELECT MIN(id) FROM tour_dates GROUP BY venue, day);
+    DELETE FROM tour_dates WHERE id IN (SELECT id FROM double_bookings);
+
+    DROP INDEX IF EXISTS idx_tour_dates_venue_day;
+    CREATE UNIQUE INDEX idx_tour_dates_venue_day ON tour_dates(venue, day);
+    """
+
+def fts5_tokenizer(conn):
+    # The trigram tokenizer (SQLite 3.34+) allows substring and typo-tolerant
+    # search; older libraries fall back to matching word prefixes.
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x, tokenize = 'trigram')")
+    except sqlite3.OperationalError:
+        return "unicode61 remove_diacritics 2"
+    conn.execute("DROP TABLE temp.fts5_probe")
+    return "trigram"
+
+def search_index_script(tokenizer):
+    # Band names, locations and venues are indexed once per distinct term
+    # rather than once per tour date, with uses counting the rows behind
+    # each place. Triggers keep search_terms in step with bands and
+    # tour_dates, and search_index in step with search_terms.
+    return f'''
+    CREATE TABLE search_terms (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        term TEXT NOT NULL,
+        ref INTEGER,
+        uses INTEGER NOT NULL DEFAULT 1,
+        UNIQUE (kind, term)
+    );
+    CREATE VIRTUAL TABLE search_index USING fts5(
+        term, content = 'search_terms', content_rowid = 'id', tokenize = '{tokenizer}'
+    );
+
+    CREATE TRIGGER search_terms_insert AFTER INSERT ON search_terms BEGIN
+        INSERT INTO search_index (rowid, term) VALUES (new.id, new.term);
+    END;
+    CREATE TRIGGER search_terms_delete AFTER DELETE ON search_terms BEGIN
+        INSERT INTO search_index (search_index, rowid, term) VALUES ('delete', old.id, old.term);
+    END;
+    CREATE TRIGGER search_terms_rename AFTER UPDATE OF term ON search_terms BEGIN
+        INSERT INTO search_index (search_index, rowid, term) VALUES ('delete', old.id, old.term);
+        INSERT INTO search_index (rowid, term) VALUES (new.id, new.term);
+    END;
+
+    CREATE TRIGGER bands_search_insert AFTER INSERT ON bands BEGIN
+        INSERT INTO search_terms (kind, term, ref) VALUES ('band', new.name, new.id);
+    END;
+    CREATE TRIGGER bands_search_rename AFTER UPDATE OF name ON bands BEGIN
+        UPDATE search_terms SET term = new.name WHERE kind = 'band' AND ref = old.id;
+    END;
+    CREATE TRIGGER bands_search_delete AFTER DELETE ON bands BEGIN
+        DELETE FROM search_terms WHERE kind = 'band' AND ref = old.id;
+    END;
+
+    {TOUR_DATES_SEARCH_TRIGGERS}
+    INSERT INTO search_terms (kind, term, ref) SELECT 'band', name, id FROM bands;
+    INSERT INTO search_terms (kind, term, uses) SELECT 'location', location, COUNT(*) FROM tour_dates GROUP BY location;
+    INSERT INTO search_terms (kind, term, uses) SELECT 'venue', venue, COUNT(*) FROM tour_dates GROUP BY venue;
+    '''
+
+def statements(script):
+    # executescript() commits whatever transaction is open first, so scripts
+    # that have to run inside migrate()'s are fed one statement at a time.
+    # complete_statement() keeps trigger bodies and quoted semicolons whole.
+    statement = ""
+    for part in script.split(";"):
+        statement += part + ";"
+        if sqlite3.complete_statement(statement):
+            if statement.strip(" \t\n;"):
+                yield statement
+            statement = ""
+
+def migrate(conn, migrations=MIGRATIONS, schema="main"):
+    # Table rebuilds must not trip foreign keys mid-copy; the pragma is a
+    # no-op inside a transaction, so it is switched off around all of them.
+    conn.execute("PRAGMA foreign_keys = OFF")
+    if conn.execute(f"PRAGMA {schema}.user_version").fetchone()[0] >= len(migrations):
+        return
+
+    # Other processes may be upgrading the same file. The version is read
+    # again under the write lock, so whoever gets it second finds the work
+    # done instead of replaying it over a newer schema.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute(f"PRAGMA {schema}.user_version").fetchone()[0]
+        for number, script in enumerate(migrations[version:], start=version + 1):
+            if callable(script):
+                script = script(conn)
+            for statement in statements(script):
+                conn.execute(statement)
+            conn.execute(f"PRAGMA {schema}.user_version = {number}")
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
@@ -0,0 +1,137 @@
+from collections import namedtuple
+from difflib import SequenceMatcher
+from models import connection
+from models.connection import query
+
+KINDS = ("band", "location", "venue")
+
+Match = namedtuple("Match", "kind term ref uses score")
+
+# Tiers are added to the similarity ratio, so an exact match always ranks
+# above a prefix match, a prefix above a substring, and a substring above a
+# fuzzy guess.
+EXACT, PREFIX, SUBSTRING, FUZZY = 3, 2, 1, 0
+
+FUZZY_CANDIDATES = 200
+FUZZY_CUTOFF = 0.5
+COMMON_GRAM = 2500
+
+_tokenizers = {}
+
+def tokenizer():
+    path = connection.DB_PATH
+    if path not in _tokenizers:
+        row = query("SELECT sql FROM sqlite_master WHERE name = 'search_index'").fetchone()
+        _tokenizers[path] = "trigram" if row and "trigram" in row[0] else "unicode61"
+    return _tokenizers[path]
+
+def normalize(text):
+    return str(text).strip().lower()
+
+def quoted(text):
+    return '"' + text.replace('"', '""') + '"'
+
+def substring_query(text):
+    if tokenizer() == "trigram":
+        return quoted(text) if len(text) >= 3 else None
+    words = text.split()
+    return " AND ".join(quoted(word) + " *" for word in words) if words else None
+
+def fuzzy_query(text):
+    # Terms sharing a trigram with the text (or, without the trigram
+    # tokenizer, a two-letter word start) are candidates, re-ranked by
+    # similarity in Python. Trigrams found in thousands of terms ("ban",
+    # "ue ") add little but make ranking slow, so only the rarer ones are
+    # used when there are any.
+    if tokenizer() != "trigram":
+        words = {word[:2] for word in text.split()}
+        return " OR ".join(quoted(word) + " *" for word in sorted(words)) if words else None
+
+    counts = {}
+    for gram in {text[index:index + 3] for index in range(len(text) - 2)}:
+        count = query(
+            "SELECT COUNT(*) FROM (SELECT rowid FROM search_index WHERE search_index MATCH ? LIMIT ?)",
+            (quoted(gram), COMMON_GRAM + 1),
+        ).fetchone()[0]
+        if count:
+            counts[gram] = count
+
+    grams = [gram for gram, count in counts.items() if count <= COMMON_GRAM]
+    grams = grams or sorted(counts, key=counts.get)[:3]
+    return " OR ".join(quoted(gram) for gram in sorted(grams)) if grams else None
+
+def kind_filter(kinds):
+    return f"kind IN ({', '.join('?' * len(kinds))})", list(kinds)
+
+def exact_and_prefix(text, kinds, limit):
+    # One range scan of the (kind, term) index per kind; in term order the
+    # exact match, if any, comes first.
+    rows = []
+    for kind in kinds:
+        rows.extend(query(
+            """
+            SELECT kind, term, ref, uses FROM search_terms
+            WHERE kind = ? AND term >= ? AND term < ?
+            ORDER BY term
+            LIMIT ?
+            """,
+            (kind, text, text + "\U0010ffff", limit),
+        ).fetchall())
+    return rows
+
+def matching(match_query, kinds, limit):
+    if not match_query:
+        return []
+    where, params = kind_filter(kinds)
+    return query(
+        f"""
+        SELECT search_terms.kind, search_terms.term, search_terms.ref, search_terms.uses
+        FROM search_index
+        JOIN search_terms ON search_terms.id = search_index.rowid
+        WHERE search_index MATCH ? AND search_terms.{where}
+        ORDER BY search_index.rank
+        LIMIT ?
+        """,
+        (match_query, *params, limit),
+    ).fetchall()
+
+def search(text, kinds=KINDS, limit=10):
+    # Ranked matches for free text across band names, locations and venues,
+    # best first. Exact and prefix matches come from the (kind, term) index;
+    # substring and fuzzy matches from the FTS5 search_index.
+    text = normalize(text)
+    kinds = tuple(kinds)
+    if not text or not kinds:
+        return []
+
+    found = {}
+
+    def collect(rows, fuzzy=False):
+        for kind, term, ref, uses in rows:
+            if (kind, term) in found:
+                continue
+            ratio = SequenceMatcher(None, text, term).ratio()
+            if fuzzy:
+                if ratio < FUZZY_CUTOFF:
+                    continue
+                tier = FUZZY
+            else:
+                tier = EXACT if term == text else PREFIX if term.startswith(text) else SUBSTRING
+            found[(kind, term)] = Match(kind, term, ref, uses, round(tier + ratio, 4))
+
+    collect(exact_and_prefix(text, kinds, limit))
+    if len(found) < limit:
+        collect(matching(substring_query(text), kinds, limit * 2))
+    if len(found) < limit:
+        collect(matching(fuzzy_query(text), kinds, FUZZY_CANDIDATES), fuzzy=True)
+    if len(found) < limit and len(text) > 2:
+        # Short words with a transposed letter ("pairs") share no trigram
+        # with the intended term, so terms starting the same way are tried too.
+        collect(exact_and_prefix(text[:2], kinds, FUZZY_CANDIDATES), fuzzy=True)
+
+    return sorted(found.values(), key=lambda match: (-match.score, -match.uses, match.term))[:limit]
+
+def exists(kind, term):
+    return query(
+        "SELECT 1 FROM search_terms WHERE kind = ? AND term = ?", (kind, normalize(term)),
+    ).fetchone() is not None
@@ -0,0 +1,74 @@
+from collections import namedtuple
+from datetime import date
+from models.availability import day_ordinal
+from models.connection import cached_query, touch, transaction
+from models.schema import STATS_REBUILD, STATS_TABLES
+
+# Read side of the per-band, per-venue and per-location summary tables that
+# triggers on tour_dates keep current. Counts, first and last days are
+# stored; the next and upcoming figures depend on today, so they come from
+# the stored first day when it has not passed yet and from an index seek
+# on tour_dates for the few keys whose first show is already behind them.
+
+Summary = namedtuple("Summary", "key name tours upcoming first next last")
+
+TABLES = dict(zip(("band", "venue", "location"), STATS_TABLES))
+
+ORDERS = {
+    "tours": "s.tours DESC, name",
+    "next": '"next [day]" IS NULL, "next [day]", name',
+    "last": "s.last_day DESC, name",
+    "name": "name",
+}
+
+def table_for(kind):
+    if kind not in TABLES:
+        raise ValueError(f"No statistics kept by '{kind}'.")
+    return TABLES[kind]
+
+def summary_select(kind):
+    table, column = table_for(kind)
+    if kind == "band":
+        name, join = "bands.name", "JOIN bands ON bands.id = s.band_id"
+    else:
+        name, join = f"s.{column}", ""
+    # ?1 is today's day ordinal.
+    return f'''
+        SELECT s.{column}, {name} AS name, s.tours,
+            CASE WHEN s.first_day >= ?1 THEN s.tours
+                 WHEN s.last_day < ?1 THEN 0
+                 ELSE (SELECT COUNT(*) FROM tour_dates t WHERE t.{column} = s.{column} AND t.day >= ?1) END,
+            s.first_day AS "first [day]",
+            CASE WHEN s.first_day >= ?1 THEN s.first_day
+                 WHEN s.last_day < ?1 THEN NULL
+                 ELSE (SELECT MIN(t.day) FROM tour_dates t WHERE t.{column} = s.{column} AND t.day >= ?1) END
+                AS "next [day]",
+            s.last_day AS "last [day]"
+        FROM {table} s {join}
+    '''
+
+def summaries(kind, order="tours", limit=20, today=None):
+    if order not in ORDERS:
+        raise ValueError(f"Cannot order statistics by '{order}'.")
+    table, _ = table_for(kind)
+    sql = summary_select(kind) + f" ORDER BY {ORDERS[order]} LIMIT ?2"
+    return cached_query(sql, (day_ordinal(today or date.today()), limit),
+                        ("tour_dates", "bands", table), Summary._make)
+
+def summary_for(kind, key, today=None):
+    table, column = table_for(kind)
+    if kind != "band":
+        key = key.strip().lower()
+    rows = cached_query(summary_select(kind) + f" WHERE s.{column} = ?2", (day_ordinal(today or date.today()), key),
+                        ("tour_dates", "bands", table), Summary._make)
+    return rows[0] if rows else None
+
+def rebuild():
+    # For tables edited outside the triggers' reach, e.g. with the triggers
+    # dropped for a bulk load.
+    with transaction() as conn:
+        for statement in STATS_REBUILD.split(";"):
+            if statement.strip():
+                conn.execute(statement)
+        touch(*(table for table, _ in STATS_TABLES))
+    return {kind: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for kind, (table, _) in TABLES.items()}
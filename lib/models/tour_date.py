@@ -1,8 +1,46 @@
-from models.__init__ import CONN, CURSOR
-from datetime import datetime
+import sqlite3
+from models.availability import AvailabilityIndex, day_ordinal
+from models.band import Band
+from models.connection import cached_query, cached_stream, check_external_changes, query, register_cache, touch, transaction
+from models.identity_map import IdentityMap
+from models.validators import validate_location, validate_tour_date, validate_venue
+from datetime import date
+
+PAGE_SIZE = 20
+ARCHIVE_BATCH_SIZE = 5000
+ARCHIVE_TABLE = "archive.tour_dates"
+
+# The "day [day]" alias makes the connection hand the day ordinal back as a date.
+TOUR_COLUMNS = 'tour_dates.id, tour_dates.band_id, tour_dates.location, tour_dates.venue, tour_dates.day AS "day [day]"'
+
+JOINED_SELECT = f"""
+    SELECT {TOUR_COLUMNS}, bands.name, bands.genre
+    FROM tour_dates
+    JOIN bands ON tour_dates.band_id = bands.id
+"""
+
+# History listings add past tour dates moved to the archive database (see
+# TourDate.archive_before), with a last column telling the two apart.
+HISTORY_SELECT = f"""
+    SELECT {TOUR_COLUMNS}, bands.name, bands.genre, 0
+    FROM tour_dates
+    JOIN bands ON tour_dates.band_id = bands.id
+"""
+ARCHIVED_SELECT = """
+    SELECT archived.id, archived.band_id, archived.location, archived.venue, archived.day, bands.name, bands.genre, 1
+    FROM archive.tour_dates AS archived
+    JOIN bands ON archived.band_id = bands.id
+"""
 
 class TourDate:
+    __slots__ = ("id", "band_id", "_location", "_date", "_venue")
+
+    identity_map = IdentityMap(maxsize=50000)
+    availability = AvailabilityIndex()
+    archived = False
+
     def __init__(self, band_id, location, date, venue):
+        self.id = None
         self.band_id = band_id
         self.location = location
         self.date = date
@@ -14,9 +52,7 @@ class TourDate:
 
     @location.setter
     def location(self, value):
-        if not value.strip():
-            raise ValueError("Location cannot be empty.")
-        self._location = value.strip().lower()
+        self._location = validate_location(value)
 
     @property
     def date(self):
@@ -24,13 +60,7 @@ class TourDate:
 
     @date.setter
     def date(self, value):
-
-        if isinstance(value, str):
-            value = datetime.strptime(value, "%Y-%m-%d")
-
-        if value < datetime.now():
-            raise ValueError("Tour date cannot be in the past.")
-        self._date = value
+        self._date = validate_tour_date(value)
 
     @property
     def venue(self):
@@ -38,91 +68,348 @@ class TourDate:
 
     @venue.setter
     def venue(self, value):
-        
-        result = TourDate.find_by_venue_and_date(value, self.date)
-        
-        if result:
-            raise ValueError("This venue is already booked for that date.")
-        
-        if not value.strip():
-            raise ValueError("Venue cannot be empty.")
-        
-        self._venue = value.strip().lower()
+        self._venue = validate_venue(value)
+
+    @property
+    def day(self):
+        return self._date.isoformat()
+
+    @property
+    def ordinal(self):
+        return self._date.toordinal()
+
+    @property
+    def band(self):
+        return Band.find_by_id(self.band_id)
+
+    def __repr__(self):
+        return f"<TourDate {self.id}: band {self.band_id} at {self.venue}, {self.location} on {self.day}>"
+
+    @classmethod
+    def from_row(cls, row):
+        tour_id, band_id, location, venue, day = row
+        tour_date = cls.identity_map.get(tour_id)
+        if tour_date is None:
+            tour_date = cls.__new__(cls)
+            tour_date.id = tour_id
+            cls.identity_map.add(tour_id, tour_date)
+        tour_date.band_id = band_id
+        tour_date._location = location
+        tour_date._venue = venue
+        tour_date._date = day
+        return tour_date
+
+    @classmethod
+    def from_joined_row(cls, row):
+        Band.from_row((row[1], row[5], row[6]))
+        return cls.from_row(row[:5])
+
+    @classmethod
+    def from_history_row(cls, row):
+        if not row[7]:
+            return cls.from_joined_row(row[:7])
+        # Archived rows stay out of the identity map: find_by_id, update and
+        # delete only deal with live tour dates.
+        Band.from_row((row[1], row[5], row[6]))
+        tour_date = ArchivedTourDate.__new__(ArchivedTourDate)
+        tour_date.id, tour_date.band_id, tour_date._location, tour_date._venue, tour_date._date = row[:5]
+        return tour_date
+
+    @staticmethod
+    def day_of(value):
+        # The ordinal stored in tour_dates.day for a date, datetime or
+        # YYYY-MM-DD string.
+        return day_ordinal(value)
 
     @classmethod
     def all(cls):
-        return CURSOR.execute("SELECT * FROM tour_dates").fetchall()
+        return list(cls.iter_all())
+
+    @classmethod
+    def iter_all(cls):
+        return cached_stream(f"SELECT {TOUR_COLUMNS} FROM tour_dates", tables=("tour_dates",), row_factory=cls.from_row)
 
     @classmethod
     def create(cls, band_id, location, date, venue):
         tour_date = cls(band_id, location, date, venue)
-        CURSOR.execute("INSERT INTO tour_dates (band_id, location, date, venue) VALUES (?, ?, ?, ?)", 
-                       (tour_date.band_id, tour_date.location, tour_date.date, tour_date.venue))
-        CONN.commit()
-        print(f"Tour date created for band with ID {band_id}.")
+        try:
+            with transaction() as conn:
+                tour_date.id = conn.execute(
+                    "INSERT INTO tour_dates (band_id, location, venue, day) VALUES (?, ?, ?, ?)",
+                    (tour_date.band_id, tour_date.location, tour_date.venue, tour_date.ordinal)
+                ).lastrowid
+                touch("tour_dates")
+        except sqlite3.IntegrityError as e:
+            raise cls._translate(e) from None
+        cls.identity_map.add(tour_date.id, tour_date)
+        cls.availability.put(tour_date.id, tour_date.band_id, tour_date.location, tour_date.venue, tour_date.ordinal)
+        return tour_date
 
     @classmethod
     def update(cls, tour_id, new_location=None, new_date=None, new_venue=None):
+        return cls.update_many([(tour_id, new_location, new_date, new_venue)])[0]
+
+    @classmethod
+    def update_many(cls, changes):
+        # Each change is (tour_id, new_location, new_date, new_venue), with None
+        # meaning "keep". Every change is validated up front, then all of them
+        # run in one transaction, so a single bad row leaves the rest untouched.
+        fields = [(tour_id, cls._update_fields(*values)) for tour_id, *values in changes]
+        tour_ids = [tour_id for tour_id, _ in fields]
+        tour_id = None
+
+        try:
+            with transaction() as conn:
+                placeholders = ", ".join("?" * len(tour_ids))
+                days = dict(conn.execute(f"SELECT id, day FROM tour_dates WHERE id IN ({placeholders})", tour_ids))
+                for tour_id in tour_ids:
+                    if int(tour_id) not in days:
+                        raise ValueError(f"Tour date with ID {tour_id} not found.")
+
+                # Double-booking is left to the UNIQUE (venue, day) index, but
+                # it must see where the batch ends up, not each step on the
+                # way: a residency moved a day later, or two dates swapped,
+                # would clash with themselves half way. So every row being
+                # changed first steps aside to a day no booking can have (its
+                # negated id), then takes its final values.
+                moving = [(tour_id, values) for tour_id, values in fields if values]
+                conn.executemany("UPDATE tour_dates SET day = -id WHERE id = ?", [(tour_id,) for tour_id, _ in moving])
+                for tour_id, values in moving:
+                    values.setdefault("day", days[int(tour_id)])
+                    assignments = ", ".join(f"{column} = ?" for column in values)
+                    conn.execute(f"UPDATE tour_dates SET {assignments} WHERE id = ?", (*values.values(), tour_id))
+                touch("tour_dates")
+        except sqlite3.IntegrityError as e:
+            error = cls._translate(e)
+            if len(fields) > 1 and isinstance(error, ValueError):
+                error = ValueError(f"Tour date with ID {tour_id}: {error}")
+            raise error from None
+        finally:
+            for forgotten in tour_ids:
+                cls._forget(forgotten)
+
+        tour_dates = [cls.find_by_id(tour_id) for tour_id in tour_ids]
+        for tour_date in tour_dates:
+            cls.availability.put(tour_date.id, tour_date.band_id, tour_date.location, tour_date.venue, tour_date.ordinal)
+        return tour_dates
+
+    @classmethod
+    def _update_fields(cls, new_location=None, new_date=None, new_venue=None):
+        fields = {}
         if new_location:
-            CURSOR.execute("UPDATE tour_dates SET location = ? WHERE id = ?", (new_location, tour_id))
+            fields["location"] = validate_location(new_location)
         if new_date:
-            CURSOR.execute("UPDATE tour_dates SET date = ? WHERE id = ?", (new_date, tour_id))
+            fields["day"] = cls.day_of(validate_tour_date(new_date))
         if new_venue:
-            CURSOR.execute("UPDATE tour_dates SET venue = ? WHERE id = ?", (new_venue, tour_id))
-        CONN.commit()
-        print(f"Tour date with ID {tour_id} has been updated.")
+            fields["venue"] = validate_venue(new_venue)
+        return fields
 
     @classmethod
     def delete(cls, tour_id):
-        CURSOR.execute("DELETE FROM tour_dates WHERE id = ?", (tour_id,))
-        CONN.commit()
+        with transaction() as conn:
+            deleted = conn.execute("DELETE FROM tour_dates WHERE id = ?", (tour_id,)).rowcount
+            touch("tour_dates")
+        cls._forget(tour_id)
+        if deleted:
+            cls.availability.discard(int(tour_id))
+        return deleted > 0
+
+    @classmethod
+    def delete_orphans(cls):
+        with transaction() as conn:
+            deleted = conn.execute("""
+                DELETE FROM tour_dates
+                WHERE band_id IS NULL
+                   OR NOT EXISTS (SELECT 1 FROM bands WHERE bands.id = tour_dates.band_id)
+            """).rowcount
+            deleted += conn.execute("""
+                DELETE FROM archive.tour_dates
+                WHERE band_id IS NULL
+                   OR NOT EXISTS (SELECT 1 FROM bands WHERE bands.id = archive.tour_dates.band_id)
+            """).rowcount
+            touch("tour_dates", ARCHIVE_TABLE)
+        cls.identity_map.clear()
+        cls.availability.invalidate()
+        return deleted
 
     @classmethod
     def find_by_id(cls, tour_id):
-        return CURSOR.execute("SELECT * FROM tour_dates WHERE id = ?", (tour_id,)).fetchone()
+        try:
+            tour_id = int(tour_id)
+        except (TypeError, ValueError):
+            return None
+        check_external_changes()
+        tour_date = cls.identity_map.get(tour_id)
+        if tour_date is not None:
+            return tour_date
+        return query(f"SELECT {TOUR_COLUMNS} FROM tour_dates WHERE id = ?", (tour_id,), cls.from_row).fetchone()
 
     @classmethod
-    def find_by_band(cls, band_id):
-        return CURSOR.execute("""
-            SELECT tour_dates.id, bands.id, bands.name, tour_dates.location, tour_dates.date, tour_dates.venue 
-            FROM tour_dates
-            JOIN bands ON tour_dates.band_id = bands.id
-            WHERE tour_dates.band_id = ?
-            ORDER BY tour_dates.date
-        """, (band_id,)).fetchall()
+    def find_by_band(cls, band_id, include_history=False):
+        return list(cls.iter_by_band(band_id, include_history))
     
     @classmethod
-    def find_by_location(cls, location):
-        return CURSOR.execute("""
-            SELECT tour_dates.id, bands.id, bands.name, tour_dates.location, tour_dates.date, tour_dates.venue 
-            FROM tour_dates
-            JOIN bands ON tour_dates.band_id = bands.id
-            WHERE LOWER(tour_dates.location) = ?
-            ORDER BY tour_dates.date
-        """, (location.strip().lower(),)).fetchall()
+    def find_by_location(cls, location, include_history=False):
+        return list(cls.iter_by_location(location, include_history))
 
     @classmethod
-    def find_by_venue(cls, venue):
-        return CURSOR.execute("""
-            SELECT tour_dates.id, bands.id, bands.name, tour_dates.location, tour_dates.date, tour_dates.venue 
-            FROM tour_dates
-            JOIN bands ON tour_dates.band_id = bands.id
-            WHERE LOWER(tour_dates.venue) = ?
-            ORDER BY tour_dates.date
-        """, (venue.strip().lower(),)).fetchall()
+    def find_by_venue(cls, venue, include_history=False):
+        return list(cls.iter_by_venue(venue, include_history))
 
     @classmethod
     def find_by_venue_and_date(cls, venue, date):
-        return CURSOR.execute(
-            "SELECT * FROM tour_dates WHERE LOWER(venue) = ? AND DATE(date) = DATE(?)",
-            (venue.strip().lower(), date)
-        ).fetchone()
-
-    @classmethod
-    def all_chronological(cls):
-        return CURSOR.execute("""
-            SELECT tour_dates.id, bands.id, bands.name, tour_dates.location, tour_dates.date, tour_dates.venue 
-            FROM tour_dates
-            JOIN bands ON tour_dates.band_id = bands.id
-            ORDER BY tour_dates.date
-        """).fetchall()
+        tour_dates = cached_query(
+            f"SELECT {TOUR_COLUMNS} FROM tour_dates WHERE venue = ? AND day = ?",
+            (venue.strip().lower(), cls.day_of(date)),
+            ("tour_dates",),
+            cls.from_row,
+        )
+        return tour_dates[0] if tour_dates else None
+
+    @classmethod
+    def all_chronological(cls, include_history=False):
+        return list(cls.iter_chronological(include_history))
+
+    @classmethod
+    def iter_by_band(cls, band_id, include_history=False):
+        return cls._iter_joined("band", band_id, include_history)
+
+    @classmethod
+    def iter_by_location(cls, location, include_history=False):
+        return cls._iter_joined("location", location, include_history)
+
+    @classmethod
+    def iter_by_venue(cls, venue, include_history=False):
+        return cls._iter_joined("venue", venue, include_history)
+
+    @classmethod
+    def iter_chronological(cls, include_history=False):
+        return cls._iter_joined(include_history=include_history)
+
+    @classmethod
+    def page(cls, by=None, value=None, after=None, before=None, limit=PAGE_SIZE):
+        where, params = cls._filter(by, value)
+        order = "ASC"
+
+        if after:
+            where.append("(tour_dates.day, tour_dates.id) > (?, ?)")
+            params.extend(after)
+        elif before:
+            where.append("(tour_dates.day, tour_dates.id) < (?, ?)")
+            params.extend(before)
+            order = "DESC"
+
+        sql = JOINED_SELECT
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY tour_dates.day {order}, tour_dates.id {order} LIMIT ?"
+        rows = cached_query(sql, (*params, limit), ("tour_dates", "bands"), cls.from_joined_row)
+
+        return rows[::-1] if before else rows
+
+    @staticmethod
+    def page_key(tour_date):
+        return (tour_date.ordinal, tour_date.id)
+
+    @classmethod
+    def _iter_joined(cls, by=None, value=None, include_history=False):
+        where, params = cls._filter(by, value)
+        sql = HISTORY_SELECT if include_history else JOINED_SELECT
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        if not include_history:
+            sql += " ORDER BY tour_dates.day, tour_dates.id"
+            return cached_stream(sql, params, ("tour_dates", "bands"), cls.from_joined_row)
+
+        # A row can be in both tables if an archive run was interrupted
+        # between its copy and its delete; the live one wins.
+        archived, archived_params = cls._filter(by, value, "archived")
+        archived.append("NOT EXISTS (SELECT 1 FROM main.tour_dates AS live WHERE live.id = archived.id)")
+        sql += f" UNION ALL {ARCHIVED_SELECT} WHERE {' AND '.join(archived)} ORDER BY 5, 1"
+        return cached_stream(sql, [*params, *archived_params], ("tour_dates", "bands", ARCHIVE_TABLE),
+                             cls.from_history_row)
+
+    @classmethod
+    def archive_before(cls, cutoff=None, batch_size=ARCHIVE_BATCH_SIZE):
+        # Moves tour dates before cutoff (default: today) to the archive
+        # database, oldest first, a batch at a time so writers are never held
+        # up for long. In WAL mode a commit is only atomic per database file,
+        # so each batch is copied in one transaction and deleted in the next:
+        # a crash in between leaves rows in both places, never in neither,
+        # and the next run finishes the job. Rows changed after their copy
+        # are left live and picked up by the next run.
+        # Only past dates may go: the archive is outside the live table's
+        # UNIQUE (venue, day), so an archived upcoming show could be booked
+        # over.
+        today = date.today()
+        cutoff = cls.day_of(cutoff or today)
+        if cutoff > today.toordinal():
+            raise ValueError("Only past tour dates can be archived; the cutoff cannot be later than today.")
+        moved = 0
+
+        while True:
+            with transaction() as conn:
+                rows = conn.execute(
+                    "SELECT id, band_id, location, venue, day FROM main.tour_dates WHERE day < ? ORDER BY day, id LIMIT ?",
+                    (cutoff, batch_size),
+                ).fetchall()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO archive.tour_dates (id, band_id, location, venue, day) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                touch(ARCHIVE_TABLE)
+            if not rows:
+                break
+
+            with transaction() as conn:
+                conn.executemany(
+                    """
+                    DELETE FROM main.tour_dates
+                    WHERE id = ? AND band_id IS ? AND location = ? AND venue = ? AND day = ?
+                    """,
+                    rows,
+                )
+                touch("tour_dates")
+            moved += len(rows)
+
+        if moved:
+            cls.identity_map.clear()
+            cls.availability.invalidate()
+        return moved
+
+    @classmethod
+    def _forget(cls, tour_id):
+        try:
+            cls.identity_map.discard(int(tour_id))
+        except (TypeError, ValueError):
+            pass
+
+    @staticmethod
+    def _translate(error):
+        # Double-booking is enforced by the UNIQUE index on (venue, day) and
+        # band references by the foreign key on band_id.
+        if "tour_dates.venue" in str(error):
+            return ValueError("This venue is already booked for that date.")
+        if "FOREIGN KEY" in str(error):
+            return ValueError("Band not found.")
+        return error
+
+    @staticmethod
+    def _filter(by, value, table="tour_dates"):
+        if by is None:
+            return [], []
+        if by == "band":
+            return [f"{table}.band_id = ?"], [value]
+        if by in ("location", "venue"):
+            return [f"{table}.{by} = ?"], [value.strip().lower()]
+        raise ValueError(f"Cannot filter tour dates by '{by}'.")
+
+class ArchivedTourDate(TourDate):
+    __slots__ = ()
+    archived = True
+
+    def __repr__(self):
+        return f"<ArchivedTourDate {self.id}: band {self.band_id} at {self.venue}, {self.location} on {self.day}>"
+
+register_cache(TourDate.identity_map.clear)
+register_cache(TourDate.availability.invalidate)
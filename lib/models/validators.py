@@ -0,0 +1,42 @@
+from datetime import date, datetime
+
+# Field rules shared by the model setters and the bulk importer. Each function
+# returns the normalized value or raises ValueError; none of them touch the
+# database.
+
+def validate_band_name(value):
+    if not (0 < len(value) <= 50):
+        raise ValueError("Band name must be between 1 and 50 characters.")
+    if not value.strip():
+        raise ValueError("Band name cannot be empty.")
+    return value.strip().lower()
+
+def validate_genre(value):
+    if not (0 < len(value) <= 30):
+        raise ValueError("Genre must be between 1 and 30 characters.")
+    if not value.strip():
+        raise ValueError("Genre cannot be empty.")
+    return value.strip().lower()
+
+def validate_location(value):
+    if not value.strip():
+        raise ValueError("Location cannot be empty.")
+    return value.strip().lower()
+
+def validate_tour_date(value):
+    # Takes a YYYY-MM-DD string, a date or a datetime; returns a date.
+    if isinstance(value, str):
+        value = datetime.strptime(value.strip(), "%Y-%m-%d").date()
+    elif isinstance(value, datetime):
+        value = value.date()
+    elif not isinstance(value, date):
+        raise ValueError("Tour date must be a YYYY-MM-DD string or a date.")
+
+    if value < date.today():
+        raise ValueError("Tour date cannot be in the past.")
+    return value
+
+def validate_venue(value):
+    if not value.strip():
+        raise ValueError("Venue cannot be empty.")
+    return value.strip().lower()
@@ -0,0 +1,130 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from models.connection import close_connection, transaction
+
+# Group commit for concurrent writers. Callers hand write operations (any
+# callable, usually a model method) to one writer thread and get a Future
+# back. The writer runs whatever arrives within a short window, up to
+# max_batch operations, in a single transaction, each inside its own
+# savepoint: a failing operation is rolled back alone and its exception
+# goes to its own future, while the rest of the batch commits together.
+# Futures resolve only once the batch has committed.
+#
+# Operations run on the writer thread, so they must not wait on the queue
+# themselves.
+
+DEFAULT_MAX_BATCH = 256
+DEFAULT_WINDOW = 0.0
+
+class WriteQueue:
+    def __init__(self, max_batch=DEFAULT_MAX_BATCH, window=DEFAULT_WINDOW):
+        self.max_batch = max(1, max_batch)
+        self.window = window
+        self.operations = 0
+        self.batches = 0
+        self.failures = 0
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="tour-schedule-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, function, *args, **kwargs):
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The write queue is closed.")
+            self._queue.put((future, function, args, kwargs))
+        return future
+
+    def call(self, function, *args, **kwargs):
+        return self.submit(function, *args, **kwargs).result()
+
+    def close(self):
+        # Operations already queued are still written.
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def stats(self):
+        return {
+            "operations": self.operations,
+            "batches": self.batches,
+            "failures": self.failures,
+            "mean_batch": round(self.operations / self.batches, 2) if self.batches else None,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self):
+        try:
+            stop = False
+            while not stop:
+                batch, stop = self._collect()
+                if batch:
+                    self._commit(batch)
+        finally:
+            close_connection()
+
+    def _collect(self):
+        item = self._queue.get()
+        if item is None:
+            return [], True
+
+        batch = [item]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            # Past the deadline, whatever is already queued still joins.
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _commit(self, batch):
+        outcomes = []
+        try:
+            with transaction():
+                for future, function, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        outcomes.append(None)
+                        continue
+                    try:
+                        with transaction():
+                            outcomes.append((True, function(*args, **kwargs)))
+                    except Exception as e:
+                        outcomes.append((False, e))
+        except Exception as e:
+            # The commit itself failed, so nothing in the batch was written.
+            self.batches += 1
+            self.operations += len(batch)
+            self.failures += len(batch)
+            for future, _, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.operations += len(batch)
+        for (future, _, _, _), outcome in zip(batch, outcomes):
+            if outcome is None:
+                continue
+            succeeded, value = outcome
+            if succeeded:
+                future.set_result(value)
+            else:
+                self.failures += 1
+                future.set_exception(value)
@@ -0,0 +1,108 @@
+# lib/rendering.py
+
+import sys
+import zlib
+from colorama import Fore, Style
+
+CHUNK_SIZE = 1000
+
+class ColorManager:
+    COLORS = [Fore.RED, Fore.GREEN, Fore.BLUE, Fore.MAGENTA, Fore.CYAN, Fore.YELLOW, Fore.WHITE]
+
+    genre_colors = {}
+    location_colors = {}
+
+    @classmethod
+    def pick(cls, cache, key, normalized):
+        # The palette slot comes from a stable hash of the normalized key, so a
+        # genre or city keeps its colour across runs. Misses are cached under
+        # the raw key, making repeat lookups a single dict hit.
+        color = cache.get(key)
+        if color is None:
+            color = cls.COLORS[zlib.crc32(normalized.encode("utf-8")) % len(cls.COLORS)]
+            cache[key] = color
+        return color
+
+    @classmethod
+    def get_genre_color(cls, genre):
+        color = cls.genre_colors.get(genre)
+        if color is None:
+            color = cls.pick(cls.genre_colors, genre, genre.strip().lower())
+        return color
+
+    @classmethod
+    def get_location_color(cls, location):
+        color = cls.location_colors.get(location)
+        if color is None:
+            color = cls.pick(cls.location_colors, location, location.strip().lower())
+        return color
+
+class Renderer:
+    # Collects formatted lines and hands them to the stream in chunks, so a
+    # long listing costs one write() per CHUNK_SIZE rows instead of one per row.
+    def __init__(self, out=None, color=None, chunk_size=CHUNK_SIZE):
+        self.out = out or sys.stdout
+        if color is None:
+            isatty = getattr(self.out, "isatty", None)
+            color = bool(isatty and isatty())
+        self.color = color
+        self.chunk_size = chunk_size
+        self._lines = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def line(self, text, color=""):
+        if self.color and color:
+            self._lines.append(f"{color}{text}{Style.RESET_ALL}\n")
+        else:
+            self._lines.append(text + "\n")
+
+        if len(self._lines) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._lines:
+            self.out.write("".join(self._lines))
+            self._lines = []
+        self.out.flush()
+
+def band_line(band):
+    return f"ID: {band.id}, Name: {band.name}, Genre: {band.genre}"
+
+def tour_line(tour):
+    band = tour.band
+    band_name = band.name if band else None
+    return f"ID: {tour.id}, Band: {band_name} (Band ID: {tour.band_id}), Location: {tour.location}, Date: {tour.day}, Venue: {tour.venue}"
+
+def summary_line(summary):
+    next_day = summary.next.isoformat() if summary.next else "none"
+    return (f"{summary.name}: {summary.tours} dates, {summary.upcoming} upcoming, "
+            f"next {next_day}, last {summary.last.isoformat()}")
+
+def render_bands(bands, renderer=None):
+    count = 0
+    with renderer or Renderer() as out:
+        for band in bands:
+            out.line(band_line(band), ColorManager.get_genre_color(band.genre) if out.color else "")
+            count += 1
+    return count
+
+def render_summaries(summaries, renderer=None):
+    count = 0
+    with renderer or Renderer() as out:
+        for summary in summaries:
+            out.line(summary_line(summary), Fore.YELLOW)
+            count += 1
+    return count
+
+def render_tour_dates(tours, renderer=None):
+    count = 0
+    with renderer or Renderer() as out:
+        for tour in tours:
+            out.line(tour_line(tour), ColorManager.get_location_color(tour.location) if out.color else "")
+            count += 1
+    return count
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# lib/server.py
+
+import argparse
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs, urlsplit
+from commands import band_record, change_record, tour_record
+from models import change_log, connection
+from models.async_api import DEFAULT_WORKERS, AsyncSchedule
+from models.band import Band
+from models.query_cache import QUERY_CACHE
+from models.replica import start_from_env
+from models.tour_date import TourDate
+
+# A small HTTP/JSON front end over the schedule, built on asyncio streams so
+# it needs nothing beyond the standard library. It stands in for the real
+# service when load-testing the async model layer. Responses use the same
+# {"ok": ..., "data"/"error": ...} documents as command mode.
+
+MAX_BODY = 1024 * 1024
+
+REASONS = {400: "Bad Request", 404: "Not Found", 413: "Payload Too Large"}
+
+logger = logging.getLogger("tour_schedule.server")
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+    def response(self):
+        return f"{self.status} {REASONS[self.status]}", {"ok": False, "error": str(self)}
+
+# Handlers build their records on the worker thread: tour_record looks up
+# each tour's band, which must not happen on the event loop.
+
+def list_bands():
+    return [band_record(band) for band in Band.all()]
+
+def show_band(band_id):
+    band = Band.find_by_id(band_id)
+    return band_record(band) if band else None
+
+def band_tours(band_id, include_history=False):
+    return [tour_record(tour) for tour in TourDate.find_by_band(band_id, include_history)]
+
+def list_tours(by, value, after, limit):
+    return [tour_record(tour) for tour in TourDate.page(by, value, after=after, limit=limit)]
+
+def show_tour(tour_id):
+    tour = TourDate.find_by_id(tour_id)
+    return tour_record(tour) if tour else None
+
+def create_tour(band_id, location, date, venue):
+    if Band.find_by_id(band_id) is None:
+        raise ValueError("Band not found.")
+    return tour_record(TourDate.create(band_id, location, date, venue))
+
+def delete_tour(tour_id):
+    return TourDate.delete(tour_id)
+
+def list_changes(since, limit):
+    changes = [change_record(change) for change in change_log.changes_since(since, limit)]
+    return {"latest": change_log.latest_seq(), "changes": changes}
+
+class ScheduleServer:
+    def __init__(self, schedule):
+        self.schedule = schedule
+        self.requests = 0
+
+    async def route(self, method, target, body):
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        read = self.schedule.read
+
+        if method == "GET" and parts == ["bands"]:
+            return await read("bands", list_bands)
+        if method == "GET" and len(parts) == 2 and parts[0] == "bands":
+            return self.found(await read("band", show_band, int_id(parts[1])), "Band")
+        if method == "GET" and len(parts) == 3 and parts[0] == "bands" and parts[2] == "tours":
+            return await read("band_tours", band_tours, int_id(parts[1]), params.get("history") in ("1", "true"))
+        if method == "GET" and parts == ["tours"]:
+            return await read("tours", list_tours, *page_params(params))
+        if method == "GET" and len(parts) == 2 and parts[0] == "tours":
+            return self.found(await read("tour", show_tour, int_id(parts[1])), "Tour date")
+        if method == "POST" and parts == ["tours"]:
+            return await self.schedule.write(create_tour, *tour_fields(json_body(body)))
+        if method == "DELETE" and len(parts) == 2 and parts[0] == "tours":
+            if not await self.schedule.write(delete_tour, int_id(parts[1])):
+                raise HTTPError(404, "Tour date not found.")
+            return None
+        if method == "GET" and parts == ["changes"]:
+            return await read("changes", list_changes, *change_params(params))
+        if method == "GET" and parts == ["stats"]:
+            return {
+                "requests": self.requests,
+                "schedule": self.schedule.stats(),
+                "query_cache": QUERY_CACHE.stats(),
+                "replica": connection.REPLICA.stats() if connection.REPLICA else None,
+            }
+
+        raise HTTPError(404, f"No route for {method} {url.path}.")
+
+    @staticmethod
+    def found(record, what):
+        if record is None:
+            raise HTTPError(404, f"{what} not found.")
+        return record
+
+    async def handle(self, reader, writer):
+        # HTTP/1.1 with keep-alive, one request at a time per connection.
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                self.requests += 1
+                try:
+                    length = content_length(headers)
+                except HTTPError as e:
+                    # The body is left unread, so the connection cannot be reused.
+                    await self.send(writer, *e.response(), close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, document = await self.respond(request_line.decode("latin-1"), body)
+                await self.send(writer, status, document)
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def send(writer, status, document, close=False):
+        payload = json.dumps(document).encode()
+        headers = f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+        if close:
+            headers += "Connection: close\r\n"
+        writer.write(f"{headers}\r\n".encode() + payload)
+        await writer.drain()
+
+    async def respond(self, request_line, body):
+        try:
+            method, target, _ = request_line.split()
+        except ValueError:
+            return "400 Bad Request", {"ok": False, "error": "Malformed request line."}
+
+        try:
+            return "200 OK", {"ok": True, "data": await self.route(method, target, body)}
+        except HTTPError as e:
+            return e.response()
+        except ValueError as e:
+            return "400 Bad Request", {"ok": False, "error": str(e)}
+        except Exception:
+            # Anything else is a bug, but the client still gets an answer.
+            logger.exception("Request failed: %s", request_line.strip())
+            return "500 Internal Server Error", {"ok": False, "error": "Internal server error."}
+
+def content_length(headers):
+    length = headers.get("content-length") or "0"
+    if not length.isdecimal():
+        raise HTTPError(400, f"'{length}' is not a Content-Length.")
+    if int(length) > MAX_BODY:
+        raise HTTPError(413, f"Request bodies are limited to {MAX_BODY} bytes.")
+    return int(length)
+
+def int_id(value):
+    if not value.isdigit():
+        raise HTTPError(404, f"'{value}' is not an ID.")
+    return int(value)
+
+def page_params(params):
+    by = next((name for name in ("band", "location", "venue") if name in params), None)
+    value = params.get(by) if by else None
+    if by == "band":
+        value = int_id(value)
+
+    after = None
+    if "after" in params:
+        day, _, tour_id = params["after"].partition(",")
+        try:
+            after = (TourDate.day_of(day), int_id(tour_id))
+        except ValueError:
+            raise HTTPError(400, f"'{params['after']}' is not a page position.") from None
+
+    return by, value, after, limit_param(params, 100, 1000)
+
+def change_params(params):
+    since = params.get("since") or "0"
+    if not since.isdigit():
+        raise HTTPError(400, f"'{since}' is not a sequence number.")
+    return int(since), limit_param(params, 1000, 10000)
+
+def limit_param(params, default, maximum):
+    limit = params.get("limit") or str(default)
+    if not limit.isdecimal() or int(limit) < 1:
+        raise HTTPError(400, f"'{limit}' is not a positive limit.")
+    return min(int(limit), maximum)
+
+def json_body(body):
+    try:
+        fields = json.loads(body or b"{}")
+    except json.JSONDecodeError:
+        raise HTTPError(400, "Request body must be JSON.") from None
+    if not isinstance(fields, dict):
+        raise HTTPError(400, "Request body must be a JSON object.")
+    return fields
+
+def tour_fields(fields):
+    band_id = fields.get("band_id")
+    if not isinstance(band_id, int) or isinstance(band_id, bool):
+        raise HTTPError(400, "'band_id' must be an integer.")
+    values = [band_id]
+    for name in ("location", "date", "venue"):
+        if not isinstance(fields.get(name), str):
+            raise HTTPError(400, f"'{name}' must be a string.")
+        values.append(fields[name])
+    return values
+
+async def serve(host, port, workers, ready=None):
+    async with AsyncSchedule(workers) as schedule:
+        server = await asyncio.start_server(ScheduleServer(schedule).handle, host, port, reuse_address=True)
+        if ready:
+            ready(server)
+        async with server:
+            await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the tour schedule as HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="database worker threads")
+    args = parser.parse_args(argv)
+
+    def ready(server):
+        print(f"Serving on {', '.join(str(sock.getsockname()) for sock in server.sockets)}", flush=True)
+
+    start_from_env()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, ready))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# lib/snapshot.py
+
+import argparse
+import json
+import os
+import sys
+import time
+from array import array
+from datetime import date, datetime
+from models import connection
+from models.connection import open_connection
+
+# Columnar snapshots of the schedule for reporting. export_snapshot() writes
+# every column of bands and tour_dates to its own file of fixed-width
+# little-endian integers: ids, band ids and day ordinals as they are stored,
+# and strings (genre, name, location, venue) as int32 codes into a JSON
+# string table. load_snapshot() memory-maps those files as NumPy arrays
+# without copying, so grouped reports run vectorised over millions of rows
+# and never touch the live database. NumPy is only needed for loading.
+
+FORMAT = 1
+MANIFEST = "manifest.json"
+CHUNK_ROWS = 65536
+
+# Day ordinal of 1970-01-01, to turn day ordinals into numpy datetime64[D].
+UNIX_EPOCH = date(1970, 1, 1).toordinal()
+
+TABLES = {
+    "bands": (
+        "SELECT id, name, genre FROM bands ORDER BY id",
+        (("id", "q"), ("name", "str"), ("genre", "str")),
+    ),
+    "tour_dates": (
+        "SELECT id, band_id, location, venue, day FROM tour_dates ORDER BY day, id",
+        (("id", "q"), ("band_id", "q"), ("location", "str"), ("venue", "str"), ("day", "i")),
+    ),
+}
+
+DTYPES = {"q": "<i8", "i": "<i4", "str": "<i4"}
+
+def column_file(table, column):
+    return f"{table}.{column}.bin"
+
+def dictionary_file(table, column):
+    return f"{table}.{column}.json"
+
+def write_chunk(out, values):
+    if sys.byteorder == "big":
+        values.byteswap()
+    values.tofile(out)
+
+def export_table(conn, directory, table):
+    sql, columns = TABLES[table]
+    files = {name: open(os.path.join(directory, column_file(table, name)), "wb") for name, _ in columns}
+    codes = {name: {} for name, kind in columns if kind == "str"}
+    rows = 0
+
+    try:
+        cursor = conn.execute(sql)
+        while True:
+            chunk = cursor.fetchmany(CHUNK_ROWS)
+            if not chunk:
+                break
+            rows += len(chunk)
+            for index, (name, kind) in enumerate(columns):
+                values = [row[index] for row in chunk]
+                if kind == "str":
+                    table_codes = codes[name]
+                    # NULLs (tour dates of a deleted band) encode as -1.
+                    values = [-1 if value is None else table_codes.setdefault(value, len(table_codes))
+                              for value in values]
+                    kind = "i"
+                elif None in values:
+                    values = [-1 if value is None else value for value in values]
+                write_chunk(files[name], array(kind, values))
+    finally:
+        for out in files.values():
+            out.close()
+
+    spec = {"rows": rows, "columns": {}}
+    for name, kind in columns:
+        spec["columns"][name] = {"file": column_file(table, name), "dtype": DTYPES[kind]}
+        if kind == "str":
+            spec["columns"][name]["dictionary"] = dictionary_file(table, name)
+            with open(os.path.join(directory, dictionary_file(table, name)), "w", encoding="utf-8") as out:
+                json.dump(list(codes[name]), out)
+    return spec
+
+def export_snapshot(directory, path=None):
+    # Both tables are read inside one read transaction on a private
+    # connection, so the snapshot is consistent even while the schedule is
+    # being written to. The manifest goes last: a directory without one is an
+    # unfinished export and load_snapshot() refuses it.
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, MANIFEST)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    conn = open_connection(path or connection.DB_PATH)
+    try:
+        conn.execute("BEGIN")
+        tables = {table: export_table(conn, directory, table) for table in TABLES}
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+    manifest = {"format": FORMAT, "created": datetime.now().isoformat(timespec="seconds"), "tables": tables}
+    with open(manifest_path, "w", encoding="utf-8") as out:
+        json.dump(manifest, out, indent=2)
+    return manifest
+
+def numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("Loading a snapshot needs NumPy. Install it with 'pip install numpy'.") from None
+    return numpy
+
+class SnapshotTable:
+    def __init__(self, directory, name, spec, np):
+        self.name = name
+        self.rows = spec["rows"]
+        self.columns = {}
+        self.dictionaries = {}
+
+        for column, column_spec in spec["columns"].items():
+            dtype = np.dtype(column_spec["dtype"])
+            if self.rows:
+                values = np.memmap(os.path.join(directory, column_spec["file"]), dtype=dtype, mode="r",
+                                   shape=(self.rows,))
+            else:
+                values = np.empty(0, dtype=dtype)
+            self.columns[column] = values
+            if "dictionary" in column_spec:
+                with open(os.path.join(directory, column_spec["dictionary"]), encoding="utf-8") as source:
+                    self.dictionaries[column] = json.load(source)
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def decode(self, column, codes):
+        strings = self.dictionaries[column]
+        return [strings[code] if code >= 0 else None for code in codes]
+
+class Snapshot:
+    def __init__(self, directory):
+        np = numpy()
+        try:
+            with open(os.path.join(directory, MANIFEST), encoding="utf-8") as source:
+                manifest = json.load(source)
+        except FileNotFoundError:
+            raise ValueError(f"No complete snapshot in '{directory}'.") from None
+        if manifest.get("format") != FORMAT:
+            raise ValueError(f"Unsupported snapshot format {manifest.get('format')!r}.")
+
+        self.directory = directory
+        self.created = manifest["created"]
+        self.tables = {name: SnapshotTable(directory, name, spec, np) for name, spec in manifest["tables"].items()}
+        self.bands = self.tables["bands"]
+        self.tour_dates = self.tables["tour_dates"]
+
+    def days(self):
+        # Tour days as numpy datetime64[D].
+        return (self.tour_dates["day"] - UNIX_EPOCH).astype("datetime64[D]")
+
+def load_snapshot(directory):
+    return Snapshot(directory)
+
+def tours_per_city_month(snapshot):
+    np = numpy()
+    tours = snapshot.tour_dates
+    if not len(tours):
+        return []
+
+    months = snapshot.days().astype("datetime64[M]").astype(np.int64)
+    first = months.min()
+    span = int(months.max() - first) + 1
+    keys = tours["location"].astype(np.int64) * span + (months - first)
+    keys, counts = np.unique(keys, return_counts=True)
+
+    cities = tours.decode("location", keys // span)
+    labels = (keys % span + first).astype("datetime64[M]").astype(str)
+    return sorted(zip(cities, labels.tolist(), counts.tolist()))
+
+def busiest_venues(snapshot, limit=10):
+    np = numpy()
+    tours = snapshot.tour_dates
+    if not len(tours):
+        return []
+
+    counts = np.bincount(tours["venue"])
+    top = np.argsort(-counts, kind="stable")[:limit]
+    return list(zip(tours.decode("venue", top), counts[top].tolist()))
+
+def tours_per_genre(snapshot):
+    # Joins tour_dates to bands through a band id -> genre lookup array.
+    np = numpy()
+    bands, tours = snapshot.bands, snapshot.tour_dates
+    if not len(tours) or not len(bands):
+        return []
+
+    genre_of = np.full(int(max(bands["id"].max(), tours["band_id"].max())) + 1, -1, dtype=np.int64)
+    genre_of[bands["id"]] = bands["genre"]
+    band_ids = tours["band_id"]
+    genres = genre_of[band_ids[band_ids >= 0]]
+    counts = np.bincount(genres[genres >= 0], minlength=len(bands.dictionaries["genre"]))
+    order = np.argsort(-counts, kind="stable")
+    return [(genre, count) for genre, count in zip(bands.decode("genre", order), counts[order].tolist()) if count]
+
+REPORTS = {
+    "cities": (tours_per_city_month, ("city", "month", "tours")),
+    "venues": (busiest_venues, ("venue", "tours")),
+    "genres": (tours_per_genre, ("genre", "tours")),
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the schedule to a columnar snapshot, or report on one.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export = subparsers.add_parser("export", help="write a snapshot of bands and tour dates")
+    export.add_argument("directory")
+
+    report = subparsers.add_parser("report", help="run a grouped report over a snapshot")
+    report.add_argument("directory")
+    report.add_argument("report", choices=sorted(REPORTS))
+    report.add_argument("--limit", type=int, default=10, help="rows for the venues report")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+
+    if args.command == "export":
+        tables = export_snapshot(args.directory)["tables"]
+        print(f"Exported {tables['bands']['rows']} bands and {tables['tour_dates']['rows']} tour dates "
+              f"to {args.directory} in {time.perf_counter() - started:.2f}s.")
+        return 0
+
+    try:
+        snapshot = load_snapshot(args.directory)
+    except (ImportError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    function, header = REPORTS[args.report]
+    rows = function(snapshot, args.limit) if args.report == "venues" else function(snapshot)
+    print("\t".join(header))
+    for row in rows:
+        print("\t".join(str(value) for value in row))
+    print(f"{len(rows)} rows from {len(snapshot.tour_dates)} tour dates in {time.perf_counter() - started:.3f}s.",
+          file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import io
+from datetime import date, timedelta
+import pytest
+from commands import build_parser, run
+from models.band import Band
+from models.connection import transaction
+from models.tour_date import TourDate
+
+@pytest.fixture
+def schedule(db_path):
+    band = Band.create("Metallica", "Heavy Metal")
+    past = date.today() - timedelta(days=30)
+    with transaction() as conn:
+        # Past dates cannot be booked through the model.
+        past_id = conn.execute(
+            "INSERT INTO tour_dates (band_id, location, venue, day) VALUES (?, 'london', 'wembley stadium', ?)",
+            (band.id, past),
+        ).lastrowid
+    upcoming = TourDate.create(band.id, "paris", date.today() + timedelta(days=30), "stade de france")
+    return band, past_id, upcoming
+
+class TestArchive:
+    def test_moves_past_dates_only(self, schedule):
+        band, past_id, upcoming = schedule
+        assert TourDate.archive_before() == 1
+        assert [tour.id for tour in TourDate.find_by_band(band.id)] == [upcoming.id]
+        assert [tour.id for tour in TourDate.find_by_band(band.id, include_history=True)] == [past_id, upcoming.id]
+
+    def test_refuses_future_cutoff(self, schedule):
+        with pytest.raises(ValueError):
+            TourDate.archive_before(date.today() + timedelta(days=1))
+
+    def test_history_rows_are_flagged_and_not_live(self, schedule):
+        band, past_id, upcoming = schedule
+        TourDate.archive_before()
+        history = TourDate.find_by_band(band.id, include_history=True)
+        assert [tour.archived for tour in history] == [True, False]
+        assert TourDate.find_by_id(past_id) is None
+        assert TourDate.find_by_id(upcoming.id) is history[1]
+        assert TourDate.delete(past_id) is False
+
+    def test_delete_command_reports_archived_tour_as_missing(self, schedule):
+        band, past_id, _ = schedule
+        TourDate.archive_before()
+        TourDate.find_by_band(band.id, include_history=True)
+        out = io.StringIO()
+        assert not run(build_parser().parse_args(["tours", "delete", str(past_id)]), "json", out)
+        assert "not found" in out.getvalue()
@@ -0,0 +1,36 @@
+from datetime import date, timedelta
+import pytest
+from models import stats
+from models.band import Band
+from models.connection import query
+from models.tour_date import TourDate
+
+@pytest.fixture
+def bands(db_path):
+    metallica = Band.create("Metallica", "Heavy Metal")
+    adele = Band.create("Adele", "Pop")
+    day = date.today() + timedelta(days=30)
+    for band, venue in ((metallica, "wembley stadium"), (metallica, "stade de france"), (adele, "o2 arena")):
+        TourDate.create(band.id, "london", day, venue)
+    return metallica, adele
+
+class TestDelete:
+    def test_takes_the_bands_tour_dates_with_it(self, bands):
+        metallica, adele = bands
+        tour_ids = [tour.id for tour in TourDate.find_by_band(metallica.id)]
+        assert Band.delete(metallica.id) is metallica
+        assert Band.find_by_id(metallica.id) is None
+        assert TourDate.find_by_band(metallica.id) == []
+        assert all(TourDate.find_by_id(tour_id) is None for tour_id in tour_ids)
+        assert [tour.venue for tour in TourDate.find_by_band(adele.id)] == ["o2 arena"]
+
+    def test_keeps_summaries_and_availability_in_step(self, bands):
+        metallica, adele = bands
+        Band.delete_many([metallica.id])
+        assert stats.summary_for("band", metallica.id) is None
+        assert stats.summary_for("venue", "wembley stadium") is None
+        assert stats.summary_for("location", "london").tours == 1
+        assert query("SELECT COUNT(*) FROM tour_dates").fetchone()[0] == 1
+        today = date.today()
+        assert TourDate.availability.bookings("band", metallica.id, today, today + timedelta(days=60)) == []
+        assert TourDate.availability.is_free("venue", "wembley stadium", today + timedelta(days=30))
@@ -0,0 +1,28 @@
+import pytest
+from models import change_log
+from models.band import Band
+
+@pytest.fixture
+def logged(db_path):
+    for name in ("Metallica", "Adele", "Muse"):
+        Band.create(name, "Rock")
+    return change_log.latest_seq()
+
+class TestCompact:
+    def test_keeps_the_log_without_consumers(self, logged):
+        assert change_log.compact() == 0
+        assert change_log.status()["entries"] == 3
+        assert change_log.changes_since(0)[-1].seq == logged
+
+    def test_stops_at_the_oldest_checkpoint(self, logged):
+        tailer = change_log.ChangeTailer("search-index", batch_size=2)
+        batches = tailer.batches()
+        next(batches)
+        next(batches)  # checkpoints the first batch
+        assert change_log.compact() == 2
+        with pytest.raises(change_log.ChangeLogGap):
+            change_log.changes_since(0)
+
+    def test_explicit_bound_without_consumers(self, logged):
+        assert change_log.compact(upto=1) == 1
+        assert [change.seq for change in change_log.changes_since(1)] == [2, 3]
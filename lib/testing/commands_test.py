@@ -0,0 +1,35 @@
+import io
+import json
+from argparse import Namespace
+from commands import build_parser, run, run_batch
+
+def failing_records(out, seen):
+    yield {"id": 1}
+    # The first record has reached the output before the second is read.
+    seen.append(out.getvalue())
+    raise ValueError("Lost the database half way.")
+
+def failing_command(out, seen):
+    return Namespace(handler=lambda args: (("id",), failing_records(out, seen)))
+
+class TestRun:
+    def test_streams_records_as_they_are_read(self):
+        out, seen = io.StringIO(), []
+        assert run(failing_command(out, seen), "json", out) is False
+        assert seen == ['{"ok": true, "data": [{"id": 1}']
+        # The cut-off document is followed by an error document on its own line.
+        assert json.loads(out.getvalue().splitlines()[-1]) == {"ok": False, "error": "Lost the database half way."}
+
+    def test_buffered_errors_replace_the_document(self):
+        out, seen = io.StringIO(), []
+        assert run(failing_command(out, seen), "json", out, buffered=True) is False
+        assert seen == [""]
+        assert json.loads(out.getvalue()) == {"ok": False, "error": "Lost the database half way."}
+
+    def test_batch_carries_on_after_a_failing_command(self, db_path):
+        out = io.StringIO()
+        failures = run_batch(build_parser(), "json", ["bands create metallica metal", "bands show 999", "bands list"], out)
+        documents = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert failures == 1
+        assert [document["ok"] for document in documents] == [True, False, True]
+        assert [band["name"] for band in documents[2]["data"]] == ["metallica"]
@@ -0,0 +1,14 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from models import connection
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "tour_schedule.db")
+    connection.configure(path)
+    yield path
+    connection.close_connection()
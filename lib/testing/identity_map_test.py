@@ -0,0 +1,29 @@
+import sqlite3
+from datetime import date, timedelta
+import pytest
+from models.band import Band
+from models.tour_date import TourDate
+
+@pytest.fixture
+def tour(db_path):
+    band = Band.create("Metallica", "Heavy Metal")
+    return TourDate.create(band.id, "paris", date.today() + timedelta(days=30), "stade de france")
+
+def write_elsewhere(db_path, sql, params):
+    # As another process would, bypassing this one's connection and caches.
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute(sql, params)
+    conn.close()
+
+class TestFindById:
+    def test_sees_another_writers_band_changes(self, db_path, tour):
+        assert Band.find_by_id(tour.band_id).name == "metallica"
+        write_elsewhere(db_path, "UPDATE bands SET name = 'megadeth' WHERE id = ?", (tour.band_id,))
+        assert Band.find_by_id(tour.band_id).name == "megadeth"
+
+    def test_sees_another_writers_tour_changes(self, db_path, tour):
+        assert TourDate.find_by_id(tour.id) is tour
+        write_elsewhere(db_path, "UPDATE tour_dates SET venue = 'accor arena' WHERE id = ?", (tour.id,))
+        assert TourDate.find_by_id(tour.id).venue == "accor arena"
+        write_elsewhere(db_path, "DELETE FROM tour_dates WHERE id = ?", (tour.id,))
+        assert TourDate.find_by_id(tour.id) is None
@@ -0,0 +1,34 @@
+import json
+from datetime import date, timedelta
+import pytest
+from importer import TourDateImporter, read_rows
+from models.band import Band
+from models.tour_date import TourDate
+
+DAY = date.today() + timedelta(days=30)
+
+@pytest.fixture
+def band(db_path):
+    return Band.create("Metallica", "Heavy Metal")
+
+def tour_row(venue, day=DAY):
+    return {"band": "metallica", "location": "paris", "date": day.strftime("%Y-%m-%d"), "venue": venue}
+
+class TestTourDateImporter:
+    def test_rejects_json_that_is_not_an_object(self, band, tmp_path):
+        feed = tmp_path / "tours.jsonl"
+        feed.write_text("\n".join([json.dumps(tour_row("accor arena")), "[1, 2]", '"x"', "{"]) + "\n")
+        report = TourDateImporter().run(read_rows(str(feed)))
+        assert report.imported == 1
+        assert [line_number for line_number, _, _ in report.rejected] == [2, 3, 4]
+        assert "expected a JSON object" in report.rejected[0][1]
+
+    def test_rejects_rows_booked_by_another_writer(self, band):
+        importer = TourDateImporter()
+        # Booked after the importer loaded the existing bookings.
+        TourDate.create(band.id, "paris", DAY, "stade de france")
+        rows = [(1, tour_row("accor arena")), (2, tour_row("stade de france")), (3, tour_row("zenith"))]
+        report = importer.run(rows)
+        assert report.imported == 2
+        assert [line_number for line_number, _, _ in report.rejected] == [2]
+        assert sorted(tour.venue for tour in TourDate.find_by_band(band.id)) == ["accor arena", "stade de france", "zenith"]
@@ -0,0 +1,58 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from datetime import date
+from models.connection import get_connection, query
+from models.schema import MIGRATIONS, SCHEMA_VERSION
+
+def baseline_db(path, tour_dates):
+    # The schema as the app created it before migrations existed, dates and all.
+    conn = sqlite3.connect(path)
+    conn.executescript(MIGRATIONS[0])
+    conn.execute("INSERT INTO bands (name, genre) VALUES ('Metallica', 'Heavy Metal')")
+    conn.executemany("INSERT INTO tour_dates (band_id, location, date, venue) VALUES (1, ?, ?, ?)", tour_dates)
+    conn.commit()
+    conn.close()
+
+class TestUpgrade:
+    # Opening a database created before migrations existed.
+
+    def test_upgrades_baseline_to_current_version(self, db_path):
+        baseline_db(db_path, [("London ", "2030-07-01 00:00:00", "Wembley Stadium")])
+        get_connection()
+        assert query("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        row = query('SELECT location, venue, day AS "day [day]" FROM tour_dates').fetchone()
+        assert row == ("london", "wembley stadium", date(2030, 7, 1))
+
+    def test_moves_double_bookings_aside(self, db_path):
+        baseline_db(db_path, [
+            ("london", "2030-07-01 00:00:00", "wembley stadium"),
+            ("london", "2030-07-01 00:00:00", "Wembley Stadium"),
+            ("paris", "2030-07-02 00:00:00", "wembley stadium"),
+        ])
+        get_connection()
+        assert query("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert [row[0] for row in query("SELECT id FROM tour_dates ORDER BY id")] == [1, 3]
+        assert [row[0] for row in query("SELECT id FROM double_bookings")] == [2]
+
+    def test_upgraded_database_reopens(self, db_path):
+        baseline_db(db_path, [("london", "2030-07-01 00:00:00", "wembley stadium")] * 2)
+        get_connection()
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        conn.close()
+
+    def test_concurrent_upgrades_apply_once(self, db_path):
+        baseline_db(db_path, [("london", "2030-07-01 00:00:00", "wembley stadium")] * 2)
+        lib = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        script = "import sys; from models import connection; connection.configure(sys.argv[1]); connection.get_connection()"
+        processes = [subprocess.Popen([sys.executable, "-c", script, db_path], cwd=lib, stderr=subprocess.PIPE)
+                     for _ in range(6)]
+        errors = [process.communicate()[1].decode() for process in processes]
+        assert [process.returncode for process in processes] == [0] * 6, errors
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert conn.execute("SELECT COUNT(*) FROM tour_dates").fetchone()[0] == 1
+        assert conn.execute("SELECT COUNT(*) FROM double_bookings").fetchone()[0] == 1
+        conn.close()
@@ -0,0 +1,57 @@
+import asyncio
+import json
+import pytest
+from models.async_api import AsyncSchedule
+from server import MAX_BODY, ScheduleServer
+
+async def exchange(request):
+    async with AsyncSchedule(2) as schedule:
+        server = await asyncio.start_server(ScheduleServer(schedule).handle, "127.0.0.1", 0)
+        async with server:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(request)
+            status = (await reader.readline()).decode().split(" ", 1)[1].strip()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode().strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.lower()] = value.strip()
+            document = json.loads(await reader.readexactly(int(headers["content-length"])))
+            # The server closes the connection itself after a refused body.
+            closed = headers.get("connection") == "close" and await reader.read() == b""
+            writer.close()
+    return status, document, closed
+
+def get(target):
+    return asyncio.run(exchange(f"GET {target} HTTP/1.1\r\nConnection: close\r\n\r\n".encode()))
+
+class TestRequestValidation:
+    @pytest.mark.parametrize("target", ["/tours?limit=0", "/tours?limit=-5", "/tours?limit=ten", "/changes?limit=0"])
+    def test_rejects_limits_that_are_not_positive(self, db_path, target):
+        status, document, _ = get(target)
+        assert status == "400 Bad Request"
+        assert document["ok"] is False
+
+    def test_caps_large_limits(self, db_path):
+        status, document, _ = get("/tours?limit=5000")
+        assert status == "200 OK"
+        assert document == {"ok": True, "data": []}
+
+    def test_rejects_a_malformed_content_length(self, db_path):
+        status, document, closed = asyncio.run(exchange(b"POST /tours HTTP/1.1\r\nContent-Length: lots\r\n\r\n"))
+        assert status == "400 Bad Request"
+        assert "Content-Length" in document["error"]
+        assert closed
+
+    def test_refuses_an_oversized_body(self, db_path):
+        request = f"POST /tours HTTP/1.1\r\nContent-Length: {MAX_BODY + 1}\r\n\r\n".encode()
+        status, document, closed = asyncio.run(exchange(request))
+        assert status == "413 Payload Too Large"
+        assert closed
+
+    def test_rejects_a_body_that_is_not_an_object(self, db_path):
+        status, document, _ = asyncio.run(exchange(b"POST /tours HTTP/1.1\r\nContent-Length: 6\r\nConnection: close\r\n\r\n[1, 2]"))
+        assert status == "400 Bad Request"
+        assert document["error"] == "Request body must be a JSON object."
@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+import pytest
+from models import change_log
+from models.band import Band
+from models.connection import query
+from models.tour_date import TourDate
+
+START = date.today() + timedelta(days=30)
+
+@pytest.fixture
+def residency(db_path):
+    band = Band.create("Adele", "Pop")
+    return [TourDate.create(band.id, "london", START + timedelta(days=night), "o2 arena") for night in range(3)]
+
+def venue_stats(venue):
+    return query("SELECT tours, first_day, last_day FROM venue_stats WHERE venue = ?", (venue,)).fetchone()
+
+class TestUpdateMany:
+    def test_shifts_a_residency_onto_its_own_dates(self, residency):
+        # First night first, so each row lands on the day the next one holds.
+        moved = TourDate.update_many([(tour.id, None, tour.date + timedelta(days=1), None) for tour in residency])
+        assert [tour.date for tour in moved] == [START + timedelta(days=night) for night in range(1, 4)]
+        assert venue_stats("o2 arena") == (3, (START + timedelta(days=1)).toordinal(), (START + timedelta(days=3)).toordinal())
+
+    def test_swaps_two_dates(self, residency):
+        first, second = residency[0], residency[1]
+        TourDate.update_many([(first.id, None, second.date, None), (second.id, None, first.date, None)])
+        assert TourDate.find_by_venue_and_date("o2 arena", START).id == second.id
+        assert TourDate.find_by_venue_and_date("o2 arena", START + timedelta(days=1)).id == first.id
+
+    def test_refuses_a_clash_in_the_final_state(self, residency):
+        first, second, third = residency
+        with pytest.raises(ValueError, match="already booked"):
+            TourDate.update_many([(first.id, None, third.date, None), (second.id, "leeds", None, None)])
+        assert [tour.date for tour in TourDate.find_by_band(first.band_id)] == [START + timedelta(days=night) for night in range(3)]
+        assert TourDate.find_by_id(second.id).location == "london"
+
+    def test_logs_only_final_values(self, residency):
+        seq = change_log.latest_seq()
+        TourDate.update_many([(tour.id, None, tour.date + timedelta(days=1), None) for tour in residency])
+        changes = change_log.changes_since(seq)
+        assert [change.row_id for change in changes] == [tour.id for tour in residency]
+        assert all(change.payload["day"] > 0 for change in changes)
@@ -0,0 +1,26 @@
+from datetime import date, timedelta
+import pytest
+from models.band import Band
+from models.tour_date import TourDate
+from models.writer import WriteQueue
+
+DAY = date.today() + timedelta(days=30)
+
+class TestWriteQueue:
+    def test_a_failing_operation_is_rolled_back_alone(self, db_path):
+        band = Band.create("Metallica", "Heavy Metal")
+        # A long window puts all three operations in the same batch.
+        with WriteQueue(window=0.2) as writer:
+            futures = [
+                writer.submit(TourDate.create, band.id, "london", DAY, "wembley stadium"),
+                writer.submit(TourDate.create, band.id, "paris", DAY, "wembley stadium"),
+                writer.submit(TourDate.create, band.id, "paris", DAY, "stade de france"),
+            ]
+            first, clash, third = futures
+            assert first.result().venue == "wembley stadium"
+            with pytest.raises(ValueError, match="already booked"):
+                clash.result()
+            assert third.result().venue == "stade de france"
+            stats = writer.stats()
+        assert (stats["operations"], stats["batches"], stats["failures"]) == (3, 1, 1)
+        assert sorted(tour.location for tour in TourDate.find_by_band(band.id)) == ["london", "paris"]